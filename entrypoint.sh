@@ -1,6 +1,6 @@
 #!/bin/sh
 
-if [ "$1" != "only-seedbot" ]; then
+if [ "$1" != "only-seedbot" ] && [ "$1" != "only-poller" ]; then
     echo "Running DB Migrations"
     aerich upgrade || exit 1
     echo "DB Migrations successful"
@@ -10,5 +10,10 @@ if [ "$1" = "only-migrations" ]; then
     exit 0
 fi
 
+if [ "$1" = "only-poller" ]; then
+    echo "Running seedbot poller"
+    exec seedbot-poller
+fi
+
 echo "Running seedbot"
 exec seedbot
@@ -0,0 +1,84 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS "server_player_count" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "server" INT NOT NULL,
+    "time" TIMESTAMPTZ NOT NULL,
+    "resolution" INT NOT NULL DEFAULT 0,
+    "samples" INT NOT NULL DEFAULT 1,
+    "players_min" INT NOT NULL,
+    "players_max" INT NOT NULL,
+    "players_sum" INT NOT NULL,
+    CONSTRAINT "uid_server_play_server_0c7f03" UNIQUE ("server", "resolution", "time")
+);
+CREATE INDEX IF NOT EXISTS "idx_server_play_server_33cea6" ON "server_player_count" ("server", "time");
+COMMENT ON COLUMN "server_player_count"."server" IS 'Server the players were counted on';
+COMMENT ON COLUMN "server_player_count"."time" IS 'Time of the count, or start of its bucket';
+COMMENT ON COLUMN "server_player_count"."resolution" IS 'Length of the bucket in seconds, 0 for a single count';
+COMMENT ON COLUMN "server_player_count"."samples" IS 'Number of counts in the bucket';
+COMMENT ON COLUMN "server_player_count"."players_min" IS 'Lowest player count in the bucket';
+COMMENT ON COLUMN "server_player_count"."players_max" IS 'Highest player count in the bucket';
+COMMENT ON COLUMN "server_player_count"."players_sum" IS 'Sum of the player counts in the bucket';
+COMMENT ON TABLE "server_player_count" IS 'Model representing a server''s player count over time, downsampled as it ages.';"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS "server_player_count";"""
+
+
+MODELS_STATE = (
+    "eJztXGtv2zYX/iuEv7QDsiJ1L+mG7QWcxF2yOfGQeG+HFYVAS4wtWCI9Xer6Lfrf38OL7h"
+    "dLsmPJqb8EMcVDkQ8Pz3l4eKivPZcQY8q8FwPimPq89zP62qPYJvBP+tEJ6uHlMvaAl3h4"
+    "aonKOKo0dT0H6x6UPmDLJVBkEFd3zKVnMgql1LcsXsh0qGjSWVTkU/Nfn2gemxFvThx48P"
+    "ETFJvUIF+IG/xcLrQHk1hGorOmwd8tyjVvvRRl19R7Lyryt001nVm+TaPKy7U3ZzSsbVIx"
+    "ohmhxMEe4c17js+7z3unxhmMSPY0qiK7GJMxyAP2LS823IoY6Ixy/KA3rhjgjL/lx/7L12"
+    "ev3716+/odVBE9CUvOvsnhRWOXggKB20nvm3iOPSxrCBgj3D4Tx+VdyoB3McdOPnoxkRSE"
+    "0PE0hAFgZRgGBRGIkeLsCEUbf9EsQmceV/H+mzclmP13cHdxNbh7DrV+4KNhoMxSx2/Vo7"
+    "58xoGNgORrowaIqvphAvjy9LQCgFCrEEDxLAkgvNEjcg0mQfz9fnybD2JMJAXkXxQG+NEw"
+    "de8EWabrfeomrCUo8lHzTtuu+68VB+/5zeDvNK4Xo/G5QIG53swRrYgGzgFjbjIfFrHFzw"
+    "umWF+ssGNomSesz4rqZh/ZfTtdgimeCaz4iPn4AjdyNRppf1p4Lex61svEHpd7mrllacuo"
+    "4iZv07thBrGQQ5aACygLTAfCSDaAfvn1P8gwXZ05BtSwMJdx5+byRS81fc1b2ezTvvYiCH"
+    "tz0zAI7fEq5At/GTe1IboKNKVMgbL3RGWAgf9AH66Gd0Mk20G/Cn/U+3b0mzv2m3LqtTz4"
+    "JjAX+fglhFo2/T252ND1JXpgDgLdRNGq2spyTYZ/T8otl71WT0bj29+C6mlzlvQOCjrxsz"
+    "7igVgjzJVm7gzyZy5yPeYQAwXd6h7cypzl6ve5OSu0EEm5zZaiAtwNLUXvUllkpeB1lFsZ"
+    "j5/6/Vevzvqnr96+e/P67OzNu9PQimQflZmT8+vfuEVJoB6YmKQnhF5pnmkTbYotTPU8XY"
+    "enl8TycP4EFDWSmgqwa4RXecH/GLy5/Rqfgc186iH2gHzqLsGhItVxNGe+4269KPIQv/3r"
+    "5nwItPSnNPP0mIctLY5cbdjzm+gY6BPeSYRD6Hk3Ag4zx2CV4hOx3ymwsOsJ+DR9TvRFFv"
+    "9LhV0+/DniRdgH/+wX+hF0UOLNHS3vKWC+4pgTYGmG70hCyR+gcAjbuYXrm+H9ZHDzZ8I3"
+    "XA4mQ/6kn/ALQenzt6mNRdgI+nA9uUL8J/pnfDtM7zXCepN/erxP2PeYRtlKw0YcpaA4KE"
+    "qogGK+WXfDmEUwzZ/4SCg131OQeqwpLthoKEJlugH5fnCYDa4eezuwZ+PxKDGR59cFS0vM"
+    "IFQyvQI3YxFjVsBcyzx7QqyRY2+E9WnBWgrchewWAsPlrJFJdcs3YAmZVKwz5f+QS/HSnc"
+    "t9ZJe8f42teZYmhI4yNYdK/P0fd2ormkd81ab7XrV1BW11OkISlSoCmMucpDLsCpSRaO0J"
+    "wOIGUYTd4HIvm3s6wGgGNq31juHRLnmjBwZSrQBgDp6eQ/CiBMgxJRMGf+rAKdrc5zZ9Nz"
+    "DWCY2OgXhr6eWVFyTNrXhSGi5lXCSl8FsETiV1feYi3m7ohVW7J1BbhTZWc0JDrsurLJll"
+    "gaPmFbDjuRUjrDt9XU4o9iNg5nyWVj6Kzn06njo+bvQ0Ar0idrFZ2hv1zN/J3YueKF0Tas"
+    "gZv1BPubD2he7TjEXzsES4Q+5mbFRYlIIwUXmYIinZrQjFPe+bDFHAHKQs7fcXjQgiSjkB"
+    "iWqhqDxu0+Ug1PcxxV05DE9svPOYXnpnXsLw4gGBrY/En7nh2pfhYVAR6XxP0IqQhYHXCF"
+    "NDhOm5oYDftQ7Lm7afy92SqQARR1AN8X8FKEc+d+RzlficUkzGFlxdddIapYtpcEVEYxJt"
+    "Q/pBreMYlwPsTtApZ8o3jKpu7h/VwEJWhDSo3jaeV5EtTGHaDoyG74TRm1qnpHHBrp2Ncm"
+    "fU4gFo5Mpy93HFOpqWeyxl7aBHypC5PDizWL5nDjFn9A+yFpBeQ78KsiTycxM7h2VRHBKK"
+    "HbwKaU5WV3jom1hEnhReDO4vBpdDmSvYIiVWxy5lpDg6malAi62ociNiTBG8hFDjR0atNd"
+    "LnmM5gA8UKGa06dKzGirdpfHNmaZohB6HNyty37ED48OjvXvK5iknyAsaXhZhfERhS387Y"
+    "ogTYgWzbgbo7gl1GAxYi9bUiCUncIChDNwjRnRXeHjjLXL4QOU21+Ugk1jE2chEagsS+JG"
+    "YB9stOdIeIcWcALo+FxcT2EwmrmBo6UVHO2joM4zHGYKl74aHyIUTDFCql8c4OJfw2Xzax"
+    "lF81u74Le3sbL8TyqTvbrWQBd34jsPOrZd/zTmBfKQmHuRUoS4WolwWxuwQIRoVfhs6vw8"
+    "te3NrkMPYg76pigLxpy7VC47EjyGNU/BgV3xAVDzIcOhARP566P9Ej2fgkE2o0muK4XKd2"
+    "GkNqHGf3YKhtB/3LwTLbY4x7M7FVOeIV6G2UTV6d5Mq09i2obkg7RUPFeRs6s5fQOjHkjS"
+    "dmGU0p8K7fWIsa82PpIyc+cuLDyhTJzRLhbKkgXpebIpIgSXslSJd4jZ6r63oWwQZxpgzs"
+    "rFjy/4Md8Q+NMh5KEORM6LvMZwhuGXMwK2fg7OoAofgKWsnCj0TaXvq3vj0lTg6J55/ygB"
+    "0cOKIm6O48v+lIsI8E+0iwo1uDpcw6vFhYhVJHlbfNrhYtcVPCoSa675mfhckIo7u186mr"
+    "tXj8uObeya64C1KToMVlHp+l1bo6wvNPo++EyQskxmMQMt13HNDz2KqrqHtZwbaZw0Xekg"
+    "S64C/5WU98svdPFyxGZ8RtAHNWsG2YR7JHm2xhVXV94sTsEOzqVje1qnG44GsE+2Fwjw36"
+    "YxK4bUkZD5wo6LQLkXOXz8yy9TbRMyGhhqOHEk2/bcBbA0alHJwuP5Qmgj7gdk+QwVbUxf"
+    "bSAgOOXWR6CEZc/VMGzVvf8OUCeA2YjCASkXu4H68eVTiyvWNos5cMbUrtdNGKOETqKKhj"
+    "W8HNJmfB3TzoT6ScclRPEHNk8IgXm56Lpr6+IBW/UfaUjoWT1qvi2kkKtfs9OpHUHkyunE"
+    "X+BTqgn4waLr/3yD9ACx4AZtRS09/OepLupVYUNpLYH8gvsyBHEVgBnxt+4q/Gonmc7664"
+    "mm3W0dyUVNumf8RWfOOUICVdwhZ/aYKtlGob2ytzNu8yuK5vNwBXSbUN7r1vBzY3jm9rlm"
+    "GrDeu2u61v/wfySFEX"
+)
@@ -0,0 +1,110 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS "vip_grant" (
+    "id" BIGSERIAL NOT NULL PRIMARY KEY,
+    "player_name" TEXT,
+    "hours" INT NOT NULL,
+    "expiration" TIMESTAMPTZ NOT NULL,
+    "discord_id" BIGINT NOT NULL,
+    "created" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "notified" BOOL NOT NULL DEFAULT False,
+    "hll_player_id" INT NOT NULL REFERENCES "hll_player" ("id") ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS "idx_vip_grant_hll_pla_d981a9" ON "vip_grant" ("hll_player_id");
+COMMENT ON COLUMN "vip_grant"."player_name" IS 'Name the VIP is granted under';
+COMMENT ON COLUMN "vip_grant"."hours" IS 'Seeding hours claimed';
+COMMENT ON COLUMN "vip_grant"."expiration" IS 'VIP expiration to set on the servers';
+COMMENT ON COLUMN "vip_grant"."discord_id" IS 'Discord ID of the claiming user';
+COMMENT ON COLUMN "vip_grant"."created" IS 'Time of the claim';
+COMMENT ON COLUMN "vip_grant"."notified" IS 'Whether the user was told the outcome';
+COMMENT ON TABLE "vip_grant" IS 'Model representing claimed VIP, delivered to every server through `VIP_Delivery`.';
+        CREATE TABLE IF NOT EXISTS "vip_delivery" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "server" INT NOT NULL,
+    "state" VARCHAR(7) NOT NULL DEFAULT 'pending',
+    "attempts" INT NOT NULL DEFAULT 0,
+    "next_attempt" TIMESTAMPTZ NOT NULL,
+    "error" TEXT,
+    "grant_id" BIGINT NOT NULL REFERENCES "vip_grant" ("id") ON DELETE CASCADE,
+    CONSTRAINT "uid_vip_deliver_grant_i_8e0223" UNIQUE ("grant_id", "server")
+);
+CREATE INDEX IF NOT EXISTS "idx_vip_deliver_next_at_d928ca" ON "vip_delivery" ("next_attempt") WHERE state = 'pending';
+COMMENT ON COLUMN "vip_delivery"."server" IS 'Server to grant the VIP on';
+COMMENT ON COLUMN "vip_delivery"."state" IS 'State of the delivery';
+COMMENT ON COLUMN "vip_delivery"."attempts" IS 'Failed attempts so far';
+COMMENT ON COLUMN "vip_delivery"."next_attempt" IS 'Time of the next attempt';
+COMMENT ON COLUMN "vip_delivery"."error" IS 'Error of the last attempt';
+COMMENT ON TABLE "vip_delivery" IS 'Model representing the outbox entry of a VIP grant for one server.';"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS "vip_delivery";
+        DROP TABLE IF EXISTS "vip_grant";"""
+
+
+MODELS_STATE = (
+    "eJztXWtv27gS/SuEv7QLeIs0faS7uL1AHm6T3TyKxLtdbFFoaYmxBcukV6Ka+Bb975dDUe"
+    "+HJVmx5ERfgljiUNThcHhmOKS+DxxCjAnjLw6Jbeqzwa/o+4DiBRH/JG8N0QAvl5EbcIXj"
+    "iSUL47DQxOE21rm4eosth4hLBnF021xyk1FxlbqWBReZLgqadBpecqn5r0s0zqaEz4gtbn"
+    "z5Ki6b1CD3xPF/LufarUksI9ZY04Bny+saXy3ltTPKP8iC8LSJpjPLXdCw8HLFZ4wGpU0q"
+    "32hKKLExJ1A9t11oPrROvaf/Rl5LwyJeEyMyBrnFrsUjr1sSA51RwE+0xpEvOIWn/Lz/8v"
+    "XB63ev3r5+J4rIlgRXDn54rxe+uycoEbgcD37I+5hjr4SEMcTtG7EdaFIKvOMZtrPRi4gk"
+    "IBQNT0LoA1aEoX8hBDFUnIZQXOB7zSJ0ykHF99+8KcDsz8Pr49PD6+ei1E/wNkwos6fjl+"
+    "rWvncPgA2BhLFRAURVfDcBfLm3VwJAUSoXQHkvDqB4IifeGIyD+NvN1WU2iBGRBJB/UPGC"
+    "XwxT50NkmQ7/2k1YC1CEt4ZGLxznXysK3vOLw7+SuB6fXx1JFJjDp7asRVZwJDAGk3k7jw"
+    "x+uDDB+vwO24aWusP2WV7Z9K3F/iJ5BVM8lVjBG8P7+dPI6fm59snCK2nX07NM5HbxTDOz"
+    "LG0ZFlw32wwumEEsZJOlwEUoi+gOhJFXAfrP+/8iw3R0ZhuihIVBxpmZyxeDRPfVr2X9nP"
+    "Z9EEI4mJmGQegAipB7eBiY2gBdBZpSJl/ZB7KwgAF+oM+no+sR8upB7+V8NPjRz5sNz5te"
+    "12tZ8I1FX2TjFxNq2fQPvMGGzk7QLbOR0E0UjqqNLNd49Ne42HItVurO+dXlR7940pzFZw"
+    "cFnfxZHXFfrBbmSjMbg/yZgxzObGIgv1ndg1uZs0z9PjKnuRYiLrfeUpSAu6alGJwoi6wU"
+    "vIpyK+Pxy/7+q1cH+3uv3r578/rg4M27vcCKpG8VmZOjs49gUWKo+yYmPhOKVmncXBBtgi"
+    "1M9SxdF3dPiMVxdgfkVZLoCmHXCBR5AX8MqG67xudwwVzKEbtFLnWWYkJFquFoxlzb2XhQ"
+    "ZCF++cfF0UjQ0l+SzJMzji0tilxl2LOr6BjoY2gkwgH00Ayfw8ywsErRjthuF1jY4RI+TZ"
+    "8RfZ7G/0Rhlw1/hnge9v4/24X+XDTQwxsmWmipwPwOMCeCpRmu7RFKuIGCV9hsWji7GN2M"
+    "Dy8+xeaGk8PxCO7sx+YF/+rztwnHIqgEfT4bnyL4if6+uhwlfY2g3PjvAbQJu5xplN1p2I"
+    "ii5F/2L8VUQDHf9HTDmEUwze74UCjR3xMh9VBdnONoKEJlOj75vrXZQkz1mDdgz66uzmMd"
+    "eXSWM7RkD4pCJs+ZZixiTHOYa9HMHhOrNbHXwnovZyz504XXLCQMl71CJtUt1xBDyKRynK"
+    "n5DzkUL52Z50d2afav4JqnaUIwUSb6UIl/+P1auaJZxFc53TeqrlNRV6cjJOFVRQAzmZOn"
+    "DE2Bci5rewSwOH4UoRlcbrzqHg8wmoFNa9UwPNoJVLrDIH0zl9rUxpRvCsyfZ5+0j1DRjo"
+    "FRKRqaoVzcJnheAN4VJWMm/lTRLVnnNmMWzcBYJU58JbwQLWlrsiLGmQWHhbFjBiKJ0b9B"
+    "FNnj8c8cBPUGlETVOxSlVZznbkZoQPyhyJJZlmAtUADb3CkZbm70cRlx6S8CM/ubN+WFoc"
+    "qv/RLsw4aSQ9BLYhfppa3x8Gy39ka2ROmaVENwf6R6egNrW+g+zsA8xGiCcEE3A8XSouTE"
+    "zIpjNnHJboVrbqBtXrxG9EHC0j690IwfXsuIzpSLy2Vxmy5H5J5GF3clMyAWhchieskwRQ"
+    "HDi0ZHNs4PeOYEY9+LlQsV8SbfIbojZG7gFcLUkGsWYCjE70qZA3Xrz+Ru8byIkCOoiuBf"
+    "CUrP53o+V4rPKcVkbA7qqpPWKF1Eg0siGpFoG9LPahxHuJzAboj2gClfMKqauX1UfQtZEl"
+    "K/eNt4noa2MIFpOzAarh1EbyotGUcFu7ZQDJNRi6vB4VSW6cfl62hS7qGUtYMzUorMZcGZ"
+    "xvIDs4k5pb+TlYT0TLQrJ2UkO1Gzc1jmxSHFZRvfBTQnrSuwDkAs4i2bHh/eHB+ejLzEyR"
+    "YpsVqDKiLF4TJVCVpshYVrEWOKxEMINX5m1FohfYbpVDhQLJfRqhXYcqx4k8rXp9kmGbIf"
+    "2izNfYtWx3eP/m4luS2fJM/F+6Uhhv0SI+ouUrYoBrYv23ag7ppgh1GfhXj6WpKExLZTFK"
+    "Hrh+gOcrdSHKR2osgEr8p8JBTrGBs5DgxBzC+JWIDtshPdJvK9UwAXx8IiYtuJhJXMkx2r"
+    "KGdlHRbvY1wJSz0IFo93IRqmUCmMd3Yo+7n+sInkP6vedR3h2y/wXA6fqr3dSkp05x2Bxv"
+    "fZPWVPYFspCbvpChSlQlTLgmguAYJROS+Lxq+CnW9gbTIYu5+EVjJAXrfmSqHxyBJkHxXv"
+    "o+JrouJ+hkMHIuL9qvsjXZKNdjKhRq0ujsp1ytMYUaPv3Z2hth2cX3aW2fYx7vXEViXMl6"
+    "C3YWp9eZLr5fhvQHUD2ikrys/b0NliKWonhrf9i1lGXQrc9BMrUWNYlu45cc+JdytTJDNL"
+    "BNhSTrwuM0UkRpK2SpBO8Ao9V3sXLYINYk+YsLNyyP9PeMQ/1cp4KEAQmNCTzGfwt1wDmK"
+    "UzcJpaQMjfj1cw8EORtof+pbuYEDuDxMO5JsKDExNRHXQbz2/qCXZPsHuCHe4aLGTWwcbC"
+    "MpQ6LLxpdrWsCUwJQE10l5vfpMkIoruV86nL1difNLp1siv3glQkaFGZh2dplbaOQP5peG"
+    "iat4HEeAhCpru2LfQ8MupK6l5asG3mcJw1JAVdcJew1hPt7O3TBYvRKXFqwJwWbBvmc69F"
+    "62xhWXV95MRsF+zqRju1ynE4/zSC7TC4hwb9IQncpqQMAicKOu1Y5txlM7N0uXX0TEqo19"
+    "EDibpnG0BtglGpCU73To2TQR8x7Q6Rwe6ogxdLSxhw7CCTI/HG5Y8yqF/7mpMLxGOEyfAj"
+    "EZmL+9HiYYGe7fWhzUE8tOlpp4PuiE08HRXq2FZws85acDcX+mMpp4DqEDHbCx7BZZM7aO"
+    "Lqc1LywLbHtCwct14lx05cqN3D+WRSu9+5Xi/CcXyCfjJqOLDvEU7jFTOA6FFLdX8748mb"
+    "XipFYUOJ7YH8Mg1yGIGV8DnBeYcVBs3DnLviaAuziuYmpNo2/efsDhynGCnpErb4vg62nl"
+    "Tb2J6a01mXwXXcRQ1wlVTb4N64C9/mRvFtzTJs5LA26G3B2YMnxDIFoctOLYkVKPav4EBE"
+    "I1q0jmMFncFcPmH36sxamdMsWoHkWYtycoTcZ48Ol/KmalSZ6UJN/TMaFRVPek2x75RQcs"
+    "81zDlZLPnmXyuBQ5IJeo+ewfZP8U7P+i+W9B5Z2iNjSqNB40G/W0y/5hmuWLndq4Hw9rav"
+    "DtSwGmRAK0eemjqi1q3tTayeaanCzqMirfpAH7Apw1aqPchhQq7ap0caU9WYnU5hWRw8SM"
+    "p2N4gALUWRlj6tmAGxbZZh2POPuwwEWv4e0gja4fchLP8114cPcdalnHwqbwqOSu3YNtQ2"
+    "PoGQgDuNdfVkox09gHyYWKuKKlKn8oxCfPM8rAD9Ne5V0OW1fCvdwpBfCtRw6HMZ8VPQRg"
+    "KsRjlAwtjYzJ3O0D9R3++fUq7W5k9oOPGoP5OmwTNpHsU3Bi+xOtIWHCTT8TwmyLGhnT1D"
+    "OudLNoVHEXYiE/om+s063zi0w/PJ/dLMS9xfs100Jtktjg86HLYP7KxDOGL+1w3A2G7+ba"
+    "2d4/stHk/TYN+mz6eRAwjGExxUU2kYbflYml05AarWejx0QknwH+8JUJRxU7xH1gAr+hxh"
+    "VKz9DxJ+nkmOGZ79BMfbc9gfqpYMdNbA94cb/DRhxzJD+y07g1/7LTv5X2JUDqCZlUNS+Q"
+    "tp0UXI3YlRVPtIWqnAwo//A++KOj0="
+)
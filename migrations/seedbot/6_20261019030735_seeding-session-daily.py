@@ -0,0 +1,61 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS "seeding_session_daily" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "server" INT NOT NULL,
+    "day" DATE NOT NULL,
+    "duration" BIGINT NOT NULL,
+    "sessions" INT NOT NULL,
+    "hll_player_id" INT NOT NULL REFERENCES "hll_player" ("id") ON DELETE CASCADE,
+    CONSTRAINT "uid_seeding_ses_hll_pla_2b1f0a" UNIQUE ("hll_player_id", "server", "day")
+);
+CREATE INDEX IF NOT EXISTS "idx_seeding_ses_day_5346d1" ON "seeding_session_daily" ("day");
+CREATE INDEX IF NOT EXISTS "idx_seeding_ses_hll_pla_2c2d35" ON "seeding_session_daily" ("hll_player_id");
+COMMENT ON COLUMN "seeding_session_daily"."server" IS 'Server the seeding took place on';
+COMMENT ON COLUMN "seeding_session_daily"."day" IS 'Day (in the leaderboard timezone) of the seeding';
+COMMENT ON COLUMN "seeding_session_daily"."duration" IS 'Time spent seeding during the day';
+COMMENT ON COLUMN "seeding_session_daily"."sessions" IS 'Number of seeding sessions started during the day';
+COMMENT ON TABLE "seeding_session_daily" IS 'Model representing a player''s daily seeding time per server, compacted from old seeding sessions.';"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS "seeding_session_daily";"""
+
+
+MODELS_STATE = (
+    "eJztWW1vGjkQ/ivWfmkq5aKUvPZ0PYkE0nAlUAV6rRpFK7NrYBVj011vEy7Kfz+P1/u+S3"
+    "gLoSpfojAee8fPjGcejx8NjxC7x8VelbiONTT+RI8GwyMi/8kO7SIDj8eJAZAI3KNKGcdK"
+    "PU+42BJS2sfUI1JkE89ynbFwOJNS5lMKQm5JRYcNYpHPnB8+MQUfEDEkrhy4uZVih9nkgX"
+    "jhz/Gd2XcItVPGOjZ8W8lNMRkrWYOJC6UIX+uZFqf+iMXK44kYchZpO0ztaEAYcbEgsLxw"
+    "fTAfrNP7DHcUWBqrBCYm5tikj30qEtudEQOLM8BPWuOpDQ7gK39U3h2eHJ4eHB+eShVlSS"
+    "Q5eQq2F+89mKgQaHWNJzWOBQ40FIwxbj+J64FJOfDOh9gtRi8xJQOhNDwLYQjYNAxDQQxi"
+    "HDgrQnGEH0xK2EBAiFeOjqZg9m/1+vyyer0jtd7CbrgM5iDGW3qoEowBsDGQcDbmAFGr/5"
+    "oAvtvfnwFAqVUKoBpLAyi/KEhwBtMg/tNpt4pBTEzJAPmFyQ3e2I4ldhF1PHG7mbBOQRF2"
+    "DUaPPO8HTYK3c1X9lsX1vNk+UyhwTwxctYpa4ExiDCmzf5c4/CDoYevuHru2mRvhFV6mmx"
+    "8aVUZZCWZ4oLCCHcP+wjJy2WyanymeqLyerzKJ4emVZkipOY4Vn6s2xhW3CUUuGUtcZLBI"
+    "dyCMggXQXx/+RrbjWdy1pQbFMMcbOuM9I+O+xVd5vqY9GjGExtCxbcIMUCEP8DFItRG6Gj"
+    "QdTGGwG0pZwgA/0NfL+nUdBeugD6oeGU/burniuhm43iyCryt9UYxfatIrp34jOGyoUUN9"
+    "7iIZmyg+VUtlrm79W3d65hpN9Eiz3foYqmfTWbo6aOjUz/kRD6cthLmOzJVB/sZDnuAusV"
+    "Fo1ubBrdNZYXyfOYPSDJGe93ymmAHuBTOFUdMZWQf4PMGtk8f7SuXg4KSyf3B8enR4cnJ0"
+    "uh9lkfzQtHRy1vgIGSWFephi0pVQWmUKZ0TMHqaYWUWxLkdrhApc7ICyRTKukHmNgMoe/L"
+    "FhufUmn+qI+0wg3kc+88ayoCJtOBpy3/WWPhRFiLe+XJ3VJS19n2WeggtMzSRyc8NevMSG"
+    "gd4FIxGOoAczQg4zxDIrJR2xXhdQ7AkFn2kNiXWXx7+msSuGv2B6GfbhP+uFvikNDPCGQg"
+    "uWSszvAXMiWZrtuwGhhAEUbWG5stC4qne61avPqdpQq3brMFJJ1YVQunOcuVhEi6Cvje4l"
+    "gp/oe7tVz941Ir3udwNswr7gJuP3JraTKIXiUJQKAc188+WGc0owK3Z8PCnj756c9VIuLr"
+    "loaELleCH57rt8JEs9FivIZ+12M+XIs0bJ0VIelEqOSJSZOe6A+XrkhZeQvGv0ChefrvW1"
+    "p4hk6QteRy/XCZbb6At5LNV8o7BQa2BMGzt0smJ4zBos+ouB9KL9g2z8FDURCmJsSich48"
+    "cl2gmcycTOkTR+EnUAoMKGLYI3XsRvwtM0Y4th0ZUL2g43mdaJR9yf+j+BXRGwltttw/1l"
+    "Gwcx6jNiF09Y6Dq1QhLTUZaEcSbDkt9BFFoEBYdnXeAmwIwDd07GmJ65WWSxA7YFbFGe9M"
+    "zx/v2IIWH2Qi5OzluPg2fsTNSZvfVuRPujmlTYbCpNi7l5L5UdN7C+5Oh8EZx5LC+4S5wB"
+    "+0QmCtKGtKukPVT8KLNxWJYRUSl28X1EWvKxAqSdUBJckc6rnfNqrR48krzCw1gx85+B3s"
+    "Z3hNlJbnBZWfrlTNJOtVCUv4JekmIHQBJ2kcVHY7k6sYNrMKf2ohR41V+cixrbeLLlxFtO"
+    "/BwnDrt6KjBfnxdD1BaypZJXm0B9GklaK0Gq4QnacZhClRJsE7fHZZ5VR/4/eSN+q7rXMe"
+    "RLsyZgQlkIfTdq2cz1FJCcuGkPAJAy088tuvUMYOooWF/Tv7yxOOXgx1Ne++i3/FFPHv08"
+    "iYf3XXmDk4VoEXRXnQu2BHtLsH9Dgv30P8mKkLk="
+)
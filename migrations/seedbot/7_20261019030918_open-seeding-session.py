@@ -0,0 +1,60 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS "open_seeding_session" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "server" INT NOT NULL,
+    "player_id" TEXT NOT NULL,
+    "start_time" TIMESTAMPTZ NOT NULL,
+    "last_seen" TIMESTAMPTZ NOT NULL,
+    CONSTRAINT "uid_open_seedin_server_4a5cf2" UNIQUE ("server", "player_id")
+);
+COMMENT ON COLUMN "open_seeding_session"."server" IS 'Server the session is open on';
+COMMENT ON COLUMN "open_seeding_session"."player_id" IS 'Player ID of the seeder';
+COMMENT ON COLUMN "open_seeding_session"."start_time" IS 'Start time of seeding session';
+COMMENT ON COLUMN "open_seeding_session"."last_seen" IS 'Last time the seeder was seen';
+COMMENT ON TABLE "open_seeding_session" IS 'Model representing a seeder''s open seeding session, restored when the seeding poller restarts.';"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS "open_seeding_session";"""
+
+
+MODELS_STATE = (
+    "eJztWm1vGjkQ/ivWfmkq5aqUJE16up5EAm24JlAFeq0aVSuza2CVZU13vU25KP/9Zmzv+y"
+    "4BQght+RIFezw7fmY88/jl1ggYs/tcvKgz37FGxp/k1vDomME/+a5dYtDJJNWBLYL2XSlM"
+    "E6F+IHxqCWgdUDdg0GSzwPKdiXC4B61e6LrYyC0QdLxh0hR6zreQmYIPmRgxHzquvkKz49"
+    "nsBwuin5Nrc+Aw184Y69j4bdluiulEtrU88VYK4tf6psXdcOwlwpOpGHEvlnY8OaMh85hP"
+    "BUP1wg/RfLROzzOakbI0EVEmpsbYbEBDV6SmOycGFvcQP7AmkBMc4lf+qL08ODo43n91cA"
+    "wi0pK45ehOTS+ZuxooEWj3jDvZTwVVEhLGBLfvzA/QpAJ4pyPql6OXGpKDEAzPQxgBNgvD"
+    "qCEBMQmcFaE4pj9Ml3lDgSFeOzycgdm/9cvTs/rlDkg9x9lwCGYV423dVVN9CGwCJK6NBU"
+    "DU4j8ngC/39uYAEKQqAZR9WQDhi4KpNZgF8Z9up10OYmpIDsiPHkzwynYssUtcJxBfNxPW"
+    "GSjirNHocRB8c9Pg7VzUP+dxPT3vnEgUeCCGvtQiFZwAxpgyB9epxY8NfWpd31DfNgs9vM"
+    "arZItd49o430I9OpRY4YxxflEZOTs/Nz+4dCrzerHKpLpnV5qR65qTRPC+amNccJu5xGcT"
+    "wAWCBdxBKFEKyF9v/ia2E1jct0HCpTgmGDmTF0bOfctrub+m3RoJhMbIsW3mGSjCfuDHMN"
+    "XG6GrQdDBFwW5IYYABf5BPZ83LJlF6yBtZj4y7bd1ccd1UrjfL4OuBL8rxywx64tRvqMVG"
+    "Wg0y4D6B2CTJqnpQ5uo1P/dmZ67xVPecd9rvIvF8OstWBw2d/Lk44tGwpTDXkbkyyJ8FJB"
+    "DcZzaJzNo8uHU6K43vE2dYmSGy4+7PFHPAvWSmMBo6I+sAXyS4dfJ4Xavt7x/V9vZfHR8e"
+    "HB0dHu/FWaTYNSudnLTeYUbJoB6lmGwlBKtM4YyZ2acu9ayyWIfeBnMFLXdAlZKcKyCvMR"
+    "R5gX9sVLfe5FMf89AThA9I6AUTKKhEG05GPPSDBy+KMsTbHy9OmkBLX+eZp+CCumYauYVh"
+    "L1exYaD30EhCY+jRjIjDjChkpbQj1usClwZCwmdaI2ZdF/FvaOzK4S8ZXoV99M96oT8HAx"
+    "XeWGjRUsD8BjFnwNLs0FeEEjtIPIWHlYXWRbPbq198yNSGRr3XxJ5api5ErTuvchuLWAn5"
+    "1OqdEfxJvnTazfxeI5brfTHQJhoKbnr8xqR2GqWoOWrKhIBmvsVyw7nLqFfu+GRQzt99GP"
+    "VYLq7YaGhC5QQR+R74fAylnooV5LNO5zzjyJNWxdKSHgQhR6TKzAJ7wGI9CqJNSNE1WsPb"
+    "95d621NGsvQGr6vVdZW6jd6QJ62ab5QWag2MaVPHna4YHrOBSn8ykB71/KAD1cnMB1HZSU"
+    "Kp4O7MMwWOQ3JufcDpgsrvwPNRb8xstN5dkNb8/2YE3VFBQJEJd11IIShAfRHMeQyx0s+V"
+    "nFdcAWb+d0Weky3s1+3R/OMeMSSgz4ldykvLbLxWSHe60hIdazIMsSzK8FQLa13o/poHNs"
+    "jdYxq5mQcIMqNU7KVmc/nsyM2i8V20TfF48EEu0/5+lD3adpWw9vn2a2WEaJN3ar+Hizfl"
+    "xmgesrcYz1sdxeMeBAgnYPw0vvPBnBBdCj0L8ulhXja3rOZS4pa9LEsIQirJbnnclsfdw+"
+    "MiDic4v8YotNiT0bgtr/hFi07aycyzl3Jxetx6HDznXVTTs7fejQ9645pUuhurTIuFcY+V"
+    "HTewvhQoWRmcRSzfcp85Q+89m0pIW2BXxYVg+TOcjcOy6ugRmn16E5OWYqzgMS1zmToUP6"
+    "13T+uNpnoW8/TEVp/1zkFvk1Ph+UmuOp5+ANWNaadUFOcvdXso2QGShF1i8fEEtDNbXXxw"
+    "116WAq/6iwtRY5tOt5x4y4nv48Tpc/QN4MUYtaVsqeKdjhKfRZLWSpAadEp2HHU74TJqM7"
+    "/PIc/KJf8f7Iifp888V/E6AZlQHsLQjy/pFnr8kR64aU8+MGVmH9joxwYIpo6C9T3zqL5K"
+    "nrHwkyFPvfTb4bgPS79I4vFFH+zgoBAtg+6qc8GWYG8J9m9IsO/+B8Mnyjo="
+)
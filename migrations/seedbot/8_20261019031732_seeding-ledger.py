@@ -0,0 +1,71 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS "seeding_ledger" (
+    "id" BIGSERIAL NOT NULL PRIMARY KEY,
+    "kind" VARCHAR(7) NOT NULL,
+    "amount" BIGINT NOT NULL,
+    "created" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "discord_id" BIGINT,
+    "hll_player_id" INT NOT NULL REFERENCES "hll_player" ("id") ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS "idx_seeding_led_created_c4ed74" ON "seeding_ledger" ("created");
+CREATE INDEX IF NOT EXISTS "idx_seeding_led_hll_pla_c752a0" ON "seeding_ledger" ("hll_player_id", "id");
+COMMENT ON COLUMN "seeding_ledger"."kind" IS 'Reason of the change';
+COMMENT ON COLUMN "seeding_ledger"."amount" IS 'Change to the seeding time balance';
+COMMENT ON COLUMN "seeding_ledger"."created" IS 'Time of the change';
+COMMENT ON COLUMN "seeding_ledger"."discord_id" IS 'Discord ID of the user making the change';
+COMMENT ON TABLE "seeding_ledger" IS 'Model representing an append-only change to a player''s seeding time balance.';
+        ALTER TABLE "hll_player" ADD "ledger_id" BIGINT NOT NULL DEFAULT 0;
+        COMMENT ON COLUMN "hll_player"."ledger_id" IS 'Last seeding ledger entry included in the balance snapshot';"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "hll_player" DROP COLUMN "ledger_id";
+        DROP TABLE IF EXISTS "seeding_ledger";"""
+
+
+MODELS_STATE = (
+    "eJztW21vEzkQ/ivWfrkiFVTSlpTTcVLaBNojTVAbDkSFVs6um6zq2GHXS8mh/vcbe73vL0"
+    "3SkGxLviBij732M+OZZ8buT8MjxB5y8aJFXMcaG3+inwbDEwL/yXbtIgNPp4kO2SLwkCph"
+    "HAsNPeFiS0DrNaYegSabeJbrTIXDGbQyn1LZyC0QdNgobvKZ880npuAjIsbEhY6rr9DsMJ"
+    "v8IF74c3pjXjuE2qnFOrb8tmo3xWyq2s6YeKsE5deGpsWpP2Gx8HQmxpxF0g5TOxoRRlws"
+    "iJxeuL5cvlyd3me4o2ClsUiwxMQYm1xjn4rEdufEwOJM4ger8dQGR/IrzxsvD5oHR/uvDo"
+    "5ARK0kamneBduL9x4MVAj0Bsad6scCBxIKxhi378T15JJy4J2MsVuMXmJIBkJYeBbCELAq"
+    "DMOGGMTYcFaE4gT/MClhIyFNvHF4WIHZv62Lk9PWxQ5IPZO74WDMgY33dFcj6JPAxkDKs7"
+    "EAiFr8cQL4cm9vDgBBqhRA1ZcGEL4oSHAG0yD+c9nvFYOYGJIB8iODDV7ZjiV2EXU88bWe"
+    "sFagKHctFz3xvG80Cd7OeetzFteTbv9YocA9MXLVLGqCY8BYuszrm8Thlw1DbN3cYtc2cz"
+    "28wctk812TxiTbghkeKazkjuX+wjBy2u2aHyieKb+ejzKJ7upIM6bUnMaC90Ub45zbhCKX"
+    "TAEXMBZQB8IomAD99eZvZDuexV0bJCiWY7yxM31hZNS3/Cz3x7SfRgyhMXZsmzBDipAf8m"
+    "PS1UboatC0MYXGbihhgEH+QJ9OOxcdFMyD3qh4ZNxt4+aK42agerMIvgHoohi/1KANu34j"
+    "OGzorI2uuYvANlF8qh7kuQadz4NqzzWZ6Z5uv/cuFM+6s3R00NCpn4sjHg5bCnNtmSuD/A"
+    "8PeYK7xEbhsuoHt3ZnhfZ97IxKPUR63P2eYg64l/QURlt7ZG3gixi3dh6vG439/WZjb//V"
+    "0eFBs3l4tBd5kXxXlTs5PnsnPUoK9dDFpCMhrMoUzoSYQ0wxs4psHXrbhApcrICySTKqAL"
+    "9GpMgL+Y8tp1uv82lNuM8E4tfIZ94UAirSC0dj7rvegw9FEeK9j+fHHaClr7PMU3CBqZlE"
+    "bmHYi6eoGegDuUiEI+jlMkIOM8bglZKKWK8KKPaEgs+0xsS6yePf1tgVw18wvAz78D/rhb"
+    "4LCwzwloFWrhQwv5WYE2Bptu8GhFJ2oGgLDwsLZ+edy0Hr/EMqNrRbg47saaTiQti68yqT"
+    "WESToE9ng1Mkf6Iv/V4nm2tEcoMvhlwT9gU3Gb81sZ1EKWwOm1ImoJlvPtxwTglmxYqPB2"
+    "X0PYRRv0rFJYmGJlSOF5Lva5dPINRjsQJ/1u93U4o8Pis5WkqDIOSIkjBDiT0qYa5VkT01"
+    "bKnAvhTWeyVnKQwXwbIQOC53hhxmUd+GI+Qwdc50/EMew1NvHOSRdYr+C6TmeZoQ7Nwr0K"
+    "Ke4O37C52MFlFfnXZf6tm6arZaV0niVk0CC9mTF6bMq8HlMpju6QBj2tihsxXDY7blpI8M"
+    "pF9a7eoDlzKzRlRU9yoU3K2sgHE5JKPWB9TCAjYCWamcN3Kset5dkNbZ6u2YsIi+SJEppx"
+    "R8rxTArvDmLJqt9HMF1bUrwMz9HviyuODydXuR9GsLYjHoc2KX0NLa2EQxOb9UK9G2psxQ"
+    "kjhlnsHBWhe6T7O8KDPNKOmpZ7lLeZSSzL8680yPrFfSeSnXFmSdoIOMp/39EsywSFCQY8"
+    "5XXSgiRHWuK/weKq7L/WYmkyrievlkq4LlpfO85fkdQ/ARwuznnNEZssaYjcBaeHR9+YcX"
+    "uQZlSDppno/NPWTy+29GrzKXvSGPm5u4VRU0Hh93W8t9RDnDu4H95SGWT1w6zJ8okM9g2e"
+    "GNQwrscOymWckFwR7QO01JAnudk+GlXsBUoRvykWbp65dm7vGQqskvfOsQD6vZTcNJ5AiS"
+    "CVzSA6z3esFyidr3goE/MWw9YX/Oq82BpnQL2zDsx+6DpzaiOtFjCP0alUpyV6ML6+WPTe"
+    "LKWmvXhywZTfCNOj6Lansjt9hxxC7URakicuM2XBVYa2Elx2GL8MyD+Za7xBmx92SWi74l"
+    "ddv0K7v6gVlWrIVmF99GrC9vLbKwTSgJLr1OWpcnrXYnePa2wVSgqu67WMl3ddVezlRchs"
+    "XPoseK0tsUMPbwKmXOwu6yMxfWcNNmH9cKE/WWbUl3W9K9p6QblnMF5zfSCi2ysYrutsT4"
+    "ROtPSSUTZi+l4uS4WmUaHWZvtftoqG0N48ujZbYrxvJJElv97GMOehs/EJmf5AYvVR5AdS"
+    "PaqSZKl6Gmih1IkrCLLD6ZwuzEDl7scWovS4FX/cWFqLGNZ1tOvOXE93HiVEV287xYWm0h"
+    "Wyqp1wXiVSRprQSpjWdoRz83pQTbxB1y8LPqyP8HGfGz5POHVTyrl0woC6HvRu/1Fro/SA"
+    "6s2Q2CKnGn/zJEv5KXYGorWN8FQvmr0oqDHw/Z9NHv+ZMhHP08iZd/igYZHASiZdBdtS/Y"
+    "Euwtwf4NCfbd/wtCidE="
+)
@@ -0,0 +1,86 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS "seeding_hour" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "server" INT NOT NULL,
+    "weekday" INT NOT NULL,
+    "hour" INT NOT NULL,
+    "duration" BIGINT NOT NULL,
+    "hll_player_id" INT NOT NULL REFERENCES "hll_player" ("id") ON DELETE CASCADE,
+    CONSTRAINT "uid_seeding_hou_hll_pla_f60e04" UNIQUE ("hll_player_id", "server", "weekday", "hour")
+);
+CREATE INDEX IF NOT EXISTS "idx_seeding_hou_hll_pla_817e83" ON "seeding_hour" ("hll_player_id");
+COMMENT ON COLUMN "seeding_hour"."server" IS 'Server the seeding took place on';
+COMMENT ON COLUMN "seeding_hour"."weekday" IS 'Weekday of the seeding, 0 is Monday';
+COMMENT ON COLUMN "seeding_hour"."hour" IS 'Hour of day of the seeding';
+COMMENT ON COLUMN "seeding_hour"."duration" IS 'Time spent seeding';
+COMMENT ON TABLE "seeding_hour" IS 'Model representing a player''s seeding time per server, weekday and hour of day.';
+        CREATE TABLE IF NOT EXISTS "seeding_streak" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "last_day" DATE NOT NULL,
+    "current_streak" INT NOT NULL,
+    "longest_streak" INT NOT NULL,
+    "hll_player_id" INT NOT NULL UNIQUE REFERENCES "hll_player" ("id") ON DELETE CASCADE
+);
+COMMENT ON COLUMN "seeding_streak"."last_day" IS 'Last day the player seeded';
+COMMENT ON COLUMN "seeding_streak"."current_streak" IS 'Consecutive days seeded up to last_day';
+COMMENT ON COLUMN "seeding_streak"."longest_streak" IS 'Longest streak of consecutive days seeded';
+COMMENT ON TABLE "seeding_streak" IS 'Model representing a player''s streak of consecutive days seeding.';"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS "seeding_streak";
+        DROP TABLE IF EXISTS "seeding_hour";"""
+
+
+MODELS_STATE = (
+    "eJztXG1PGzkQ/ivWfimVuIoGWujpelKAtHANpIL0WrWqVs6uSVbZ2OmutzRX8d/P4/W+v7"
+    "CbhGQD+YKIPXbsx+OZx+NxfmsuIeaA8Rdt4ljGSPsT/dYonhDxT7pqF2l4Oo1VQAnHA1sK"
+    "40ho4HIHG1yU3mDbJaLIJK7hWFNuMSpKqWfbUMgMIWjRYVTkUeuHR3TOhoSPiCMqvn0XxR"
+    "Y1yS/iBh+nY/3GIraZGKxlwnfLcp3PprLsnPJ3UhC+baAbzPYmNBKezviI0VDaonJGQ0KJ"
+    "gzmB7rnjwfBhdGqewYz8kUYi/hBjbUxygz2bx6ZbEQODUcBPjMaVExzCt/zRenlweHC0//"
+    "rgSIjIkYQlh3f+9KK5+w0lApd97U7WY459CQljhNtP4rgwpAx4JyPs5KMXa5KCUAw8DWEA"
+    "WBmGQUEEYqQ4S0Jxgn/pNqFDDireevWqBLN/21cnZ+2rHSH1HGbDhDL7On6pqlp+HQAbAQ"
+    "l7owaISnwzAXy5t1cBQCFVCKCsSwIovpETfw8mQfznuneZD2KsSQrIT1RM8JtpGXwX2ZbL"
+    "vzcT1hIUYdYw6Inr/rDj4O1ctL+kcT3p9o4lCszlQ0f2Ijs4FhiDybwZxzY/FAywMb7Fjq"
+    "lnaliLFclmqyatSboEUzyUWMGMYX6BGznrdvWPNp5Ju571MrHqck8zsm19Ggne5220C2YS"
+    "GzlkKnARyiKWA2Hkd4D+evs3Mi3XYI4pJGwMbdyRNX2hpZZv/l7u92m/tQhCbWSZJqEaiJ"
+    "Bf8GVgakN0FWhKmQJl16SwgAE+oM9nnasO8vtBb6U/0u62fnPJftNfej0Pvr5Yi3z8Eo3W"
+    "bPo1f7Oh81N0wxwkdBNFu2ohy9XvfOmXW67JTNV0e5fvA/G0OUt6BwWd/Fgf8aDZXJgrzV"
+    "wa5M9c5HLmEBMFw2oe3Mqc5er3sTUstBDJdvdbigpwz2kptFNlkZWC11FuZTzetFr7+4et"
+    "vf3XR68ODg9fHe2FViRbVWZOjs/fg0VJoB6YmKQnFKPSuTUh+gDbmBp5ui5qT4nNcf4CFH"
+    "WSWgph1wiIvIA/JnS3WuPTnjCPcsRukEfdqXCoSA0cjZjnuAtvijzELz9dHHcELX2TZp6c"
+    "cWzrceRqw57fRcNA78MgEQ6hh2EEHGaEhVWKL8Rql8DGLpfw6caIGOMs/qcKu3z4c5oXYR"
+    "/8s1rou2KAPt7gaGGkAvNbwJwIlmZ6jk8ooQKFU1jMLZxfdK777YuPCd9w2u53oKaV8AtB"
+    "6c7r1MEi7AR9Pu+fIfiIvvYuO+mzRijX/6rBmLDHmU7ZrY7NOEpBcVCUUAHFfLPuhjGbYJ"
+    "q/8FGj1HoPRKuHWuKCg4YiVJYbkO8bh02Eq8d8Cfas1+smFvL4vGBryRUUQhYvcDM2MYcF"
+    "zLXMsyeazeXY58J6r2AvBe7CHxYShsuZIYsatmeKLWRRuc+U/0MuxVN35J8jm+T9axzNsz"
+    "QhdJSpNVTN3324UkfRPOKrDt3Xqq8z0VejIyRRqSKAuczJV4ZlgdKVvT0CWNwgirAcXK79"
+    "7h4PMLqJLXu2ZHj0U+h0w0CqFQDMwZM7BI9LgOxR0mfiTx04ZZ+rPKYvB8Y6odGeIN56en"
+    "vlBUlzBXdLw6UMmqQUfoHAqU9dn7kI+g29sOp3V0ir0MbtiNCQ64LIlNm2cNQggB3uVoyw"
+    "LvXrckKx3wRmzk/fykfRue/bW8eHjZ5GoFfELrZKK6Oe+Se5azkSpWtSDYHxS/X0N9aq0H"
+    "2csWgIS4Qn5GbGRqVFKQgTlYcpki2bFaG4hrH5IQqxBilL+/SiEUFEKScgUS0UlcdtmhyE"
+    "ehpL3JTL8MTBO4/ppU/mJQwvHhBY+Er8mRvufT88LFTEd7676JaQsYlnCFNThunBUIjPtS"
+    "7L5+0/l7slUwEijqA6gn8lKFs+t+VzlficUkzGxqCuBlkbpYtpcEVEYy3WDelntY9jXE5g"
+    "t4v2gClfMKqGuXpUAwtZEdJAfN14nkW2MIXpemA0PSeM3tS6JY03bNrdKDijNV6ARq4s9x"
+    "xXrKPpdg+lrA30SBkylwdnFst3zCHWkH4gMwnpuRhXQZZEfm5i47AsikOKYgffhjQnqysQ"
+    "+iY28W8KT9rXJ+3Tjp8ruEZKrK5dykhxdDNTgRbbkfBcxJgi8SWEmn8was+QMcJ0KA5QrJ"
+    "DRqkvHaqx4kc7vzyxNM+QgtFmZ+5ZdCG8e/V1JPlcxSR6L+WUhhicCHepNMrYoAXbQdt2B"
+    "uiuCXUYDFuLra0USknhBUIZuEKI7LHw9cJh5fCFzmmrzkahZw9jISWgIEueSmAVYLTsxHC"
+    "LnnQG4PBYWa7aaSFjF1NC+inLW1mExH7MnLLUWXipvQjRMoVIa72xQwu/82yaW8qtW13PF"
+    "2X6Cx3L71F3ttWQBN/4gsPSnZU/5JLCqlITNPAqUpULUy4JYXgIEo9Ivi8HPwsdeYG1yGH"
+    "uQd1UxQD5vz7VC47EryG1UfBsVvycqHmQ4NCAivr11f6RXsvFFJtSca4nj7Rp10uhQc7u6"
+    "G0NtG+hfNpbZbmPc9xNblSNegd5G2eTVSa6f1r4A1Q1pp+yoOG/DYJOp6J2Y/osnZpvzUu"
+    "Blf2MtagzX0ltOvOXEm5UpkpslAmypIF6XmyKSIEkrJUineIZ21HM9m2CTOAMm7Kzc8v+J"
+    "E/HzuTIeShAEJvQk8xmCV8YAZuUMnGVdIBQ/QSvZ+FGTdW/9S28yIE4OiYef8hAnOOGI5k"
+    "F36flNW4K9Jdhbgh29Gixl1uHDwiqUOhJeNLta9gSmBKAmhsetn9JkhNHd2vnU1Xrc/rjm"
+    "ysmufAtSk6DF2zw8S6v1dATyT6PfCfMfkJgPQcgMz3GEnsd2XUXdyzZcN3M4yduSgi54U7"
+    "jriS/26umCzeiQuHPAnG24bpi7/ojus4VV1fWRE7NNsKsLvdSqxuGCXyNYDYN7aNAfksDN"
+    "Qcru/geUE/45"
+)
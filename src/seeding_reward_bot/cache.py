@@ -0,0 +1,109 @@
+import time
+from collections import OrderedDict
+
+from tortoise.signals import post_delete, post_save
+
+from seeding_reward_bot.config import global_config
+from seeding_reward_bot.db import HLL_Player, Seeding_Ledger
+
+# Seconds - a player saved this recently isn't cached again, so a read racing the
+# writer's commit (or replica lag) can't put the old record back
+INVALIDATION_SETTLE = 5
+
+
+class PlayerCache:
+    """
+    Bounded LRU cache of `HLL_Player` records for read-only lookups, keyed by
+    `discord_id` and `player_id`.
+
+    Players saved, deleted or given a ledger entry in this process are evicted,
+    see the signal handlers below.  Records also expire after `ttl` seconds to pick up writes made by
+    other processes, like a separate seeding poller.
+
+    Cached records are shared between callers, which must not modify them.
+    """
+
+    def __init__(self, size: int, ttl: float):
+        self.size = size
+        self.ttl = ttl
+        # (expiry, player) by primary key, least recently used first
+        self.players: OrderedDict[int, tuple[float, HLL_Player]] = OrderedDict()
+        # Primary key by ("player_id" | "discord_id", value)
+        self.keys: dict[tuple[str, str | int], int] = {}
+        # Time of the last eviction by primary key
+        self.invalidated: dict[int, float] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, field: str, value: str | int) -> HLL_Player | None:
+        pk = self.keys.get((field, value))
+        entry = self.players.get(pk) if pk is not None else None
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expiry, player = entry
+        if expiry < time.monotonic():
+            self._remove(pk)
+            self.misses += 1
+            return None
+
+        self.players.move_to_end(pk)
+        self.hits += 1
+        return player
+
+    def put(self, player: HLL_Player) -> None:
+        if not self.size:
+            return
+        now = time.monotonic()
+        if now - self.invalidated.get(player.pk, 0) < INVALIDATION_SETTLE:
+            return
+
+        self._remove(player.pk)
+        self.players[player.pk] = (now + self.ttl, player)
+        self.keys[("player_id", player.player_id)] = player.pk
+        if player.discord_id is not None:
+            self.keys[("discord_id", player.discord_id)] = player.pk
+
+        while len(self.players) > self.size:
+            self._remove(next(iter(self.players)))
+
+    def evict(self, pk: int) -> None:
+        now = time.monotonic()
+        self._remove(pk)
+        self.invalidated[pk] = now
+        if len(self.invalidated) > self.size:
+            self.invalidated = {
+                pk: evicted
+                for pk, evicted in self.invalidated.items()
+                if now - evicted < INVALIDATION_SETTLE
+            }
+
+    def _remove(self, pk: int) -> None:
+        entry = self.players.pop(pk, None)
+        if entry is None:
+            return
+        _, player = entry
+        for key in (("player_id", player.player_id), ("discord_id", player.discord_id)):
+            if self.keys.get(key) == pk:
+                del self.keys[key]
+
+
+player_cache = PlayerCache(
+    global_config.player_cache_size, global_config.player_cache_ttl
+)
+
+
+@post_save(HLL_Player)
+async def evict_saved_player(sender, instance, created, using_db, update_fields):
+    player_cache.evict(instance.pk)
+
+
+@post_delete(HLL_Player)
+async def evict_deleted_player(sender, instance, using_db):
+    player_cache.evict(instance.pk)
+
+
+@post_save(Seeding_Ledger)
+async def evict_ledger_player(sender, instance, created, using_db, update_fields):
+    player_cache.evict(instance.hll_player_id)
@@ -1,5 +1,5 @@
 import zoneinfo
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, time, timedelta, timezone
 
 import discord
 from discord import guild_only
@@ -21,9 +21,24 @@ from seeding_reward_bot.commands.util import (
     command_mention,
     parse_datetime,
     parse_to_start_end,
+    rank_totals,
+)
+from seeding_reward_bot.config import Community, global_config
+from seeding_reward_bot.db import (
+    CONTENTION_ERRORS,
+    DeliveryState,
+    HLL_Player,
+    LedgerKind,
+    Seeding_Hour,
+    Seeding_Ledger,
+    Seeding_Session,
+    Seeding_Session_Daily,
+    Seeding_Streak,
+    VIP_Delivery,
+    VIP_Grant,
+    read_connection,
+    retry_on_contention,
 )
-from seeding_reward_bot.config import global_config
-from seeding_reward_bot.db import Seeding_Session
 from seeding_reward_bot.main import HLLDiscordBot
 
 
@@ -46,7 +61,7 @@ class HLLCommands(BotCommands):
         message = (
             f"{ctx.author.mention}:",
             f"💵 Use {command_mention(cmd)} {cmd_help}",
-            f"🚜 One hour of seeding time is `{global_config.seeder_vip_reward_hours}` hour(s) of VIP status.",
+            f"🚜 One hour of seeding time is `{self.community(ctx).seeder_vip_reward_hours}` hour(s) of VIP status.",
             f"ℹ️ Check your seeding hours with {command_mention(self.seeder)}.",
         )
         return "\n".join(message)
@@ -60,7 +75,8 @@ class HLLCommands(BotCommands):
             f"- {command_mention(self.help)} - Show this help.",
             f"- {command_mention(self.register)} `Player ID` - Will register your Player ID with the bot.  This is so you are able to track and redeem seeding time via discord.",
             f"- {command_mention(self.seeder)} - See your general time seeding, and how many unclaimed hours you have.",
-            f"- {command_mention(self.claim)} `Hours` - Redeem your seeding time.  One hour of seeding time is `{global_config.seeder_vip_reward_hours}` hour(s) of VIP, starting the moment you claim it.",
+            f"- {command_mention(self.stats)} - See when and on which servers you seed, and your seeding streaks.",
+            f"- {command_mention(self.claim)} `Hours` - Redeem your seeding time.  One hour of seeding time is `{self.community(ctx).seeder_vip_reward_hours}` hour(s) of VIP, starting the moment you claim it.",
             f"- {command_mention(self.vip)} - Check your current seeding VIP status on the servers.",
         )
         message = "\n".join(message)
@@ -100,10 +116,96 @@ class HLLCommands(BotCommands):
             f" 🌱 Total seeding time (hours): `{player.total_seeding_time}`",
             f" 🏦 Unspent seeding time balance (hours): `{player.seeding_time_balance // timedelta(hours=1):,}`",
             f" 🕰️ Last seeding time: <t:{int(player.last_seed_check.timestamp())}:R>",
-            f" ℹ️ Turn your seeding hours into VIP time with {command_mention(self.claim)}. One hour of seeding = {global_config.seeder_vip_reward_hours} hour(s) of VIP.",
+            f" ℹ️ Turn your seeding hours into VIP time with {command_mention(self.claim)}. One hour of seeding = {self.community(ctx).seeder_vip_reward_hours} hour(s) of VIP.",
         )
         await ctx.respond("\n".join(message), ephemeral=True)
 
+    @hll.command()
+    async def stats(self, ctx: discord.ApplicationContext) -> None:
+        """Check when and where you seed, and your seeding streaks"""
+        await ctx.defer(ephemeral=True)
+
+        player = await self.get_player_by_discord_id(ctx.author.id)
+        hours = (
+            await Seeding_Hour.filter(
+                hll_player_id=player.pk, server__in=self.community(ctx).servers
+            )
+            .using_db(read_connection())
+            .values_list("server", "weekday", "hour", "duration")
+        )
+        streak = (
+            await Seeding_Streak.filter(hll_player_id=player.pk)
+            .using_db(read_connection())
+            .first()
+        )
+        if not hours:
+            raise EphemeralError(
+                f"{ctx.author.mention}: no seeding statistics recorded for you yet, go seed!"
+            )
+
+        by_server = {}
+        by_weekday = [timedelta()] * 7
+        by_hour = [timedelta()] * 24
+        for server, weekday, hour, duration in hours:
+            by_server[server] = by_server.get(server, timedelta()) + duration
+            by_weekday[weekday] += duration
+            by_hour[hour] += duration
+
+        def bar(duration: timedelta, longest: timedelta, width: int = 12) -> str:
+            return "█" * round(width * (duration / longest)) if longest else ""
+
+        tz = zoneinfo.ZoneInfo(global_config.leaderboard_default_timezone)
+        embed = discord.Embed(
+            title=f"Seeding Stats for {player}",
+            description=f"Days and hours in `{tz.key}`",
+        )
+        embed = add_embed_table(
+            embed,
+            headers=("Server", "Hours"),
+            data=[
+                (server, f"{duration / timedelta(hours=1):.1f}")
+                for server, duration in sorted(by_server.items())
+            ],
+            fmt="{:<6} {:>7}",
+        )
+        longest = max(by_weekday)
+        embed = add_embed_table(
+            embed,
+            headers=("Day", "Hours", ""),
+            data=[
+                (day, f"{duration / timedelta(hours=1):.1f}", bar(duration, longest))
+                for day, duration in zip(
+                    ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"), by_weekday
+                )
+            ],
+            fmt="{:<3} {:>7} {}",
+        )
+        longest = max(by_hour)
+        levels = " ▁▂▃▄▅▆▇█"
+        sparkline = "".join(
+            levels[round((len(levels) - 1) * (duration / longest))]
+            for duration in by_hour
+        )
+        peak = by_hour.index(longest)
+        embed.add_field(
+            name=f"Hour of Day (peak {peak:02}:00-{peak + 1:02}:00)",
+            value=f"```\n00    06    12    18    \n{sparkline}\n```",
+            inline=False,
+        )
+
+        current = longest_streak = 0
+        if streak is not None:
+            longest_streak = streak.longest_streak
+            if datetime.now(tz).date() - streak.last_day <= timedelta(days=1):
+                current = streak.current_streak
+        embed.add_field(
+            name="Streaks",
+            value=f"🔥 Current: `{current}` day(s)\n🏆 Longest: `{longest_streak}` day(s)",
+            inline=False,
+        )
+
+        await ctx.respond(embed=embed, ephemeral=True)
+
     @hll.command()
     async def vip(self, ctx: discord.ApplicationContext) -> None:
         """Check your VIP status"""
@@ -111,13 +213,13 @@ class HLLCommands(BotCommands):
 
         self.logger.debug(f"VIP query for `{ctx.author.id}/{ctx.author.name}`.")
 
+        community = self.community(ctx)
         player = await self.get_player_by_discord_id(ctx.author.id)
-        vip = await self.get_vip_by_player_id(player.player_id)
+        expiration = await self.get_latest_vip_by_player_id(player.player_id, community)
 
-        if vip is None:
+        if expiration is None:
             message = f"No VIP record found for {ctx.author.mention}."
         else:
-            expiration = datetime.fromisoformat(vip)
             message = f"{ctx.author.mention}: your VIP "
             if expiration < datetime.now(timezone.utc):
                 message += "appears to have expired."
@@ -130,16 +232,19 @@ class HLLCommands(BotCommands):
                 # https://discord.com/developers/docs/reference#message-formatting-formats
                 message += f"expires <t:{int(expiration.timestamp())}:R>"
 
+        pending = await self.pending_vip_servers(player, community)
+        if pending:
+            message += f"\n⏳ Your latest claim is still being granted on server(s) {', '.join(map(str, pending))}."
+
         await ctx.respond(message, ephemeral=True)
 
     @hll.command()
     @option(
         "hours",
         input_type=int,
-        description=f"Seeding hours to claim, at a conversion of one seeding hour = {global_config.seeder_vip_reward_hours} hour(s) of VIP",
+        description="Seeding hours to claim, see /hll help for the hours of VIP per seeding hour",
         min_value=1,
     )
-    @atomic()
     async def claim(
         self, ctx: discord.ApplicationContext, hours: int | None = None
     ) -> None:
@@ -152,52 +257,29 @@ class HLLCommands(BotCommands):
             )
             raise EphemeralError(message)
 
-        player = await self.get_player_by_discord_id(ctx.author.id, update=True)
-        vip = await self.get_vip_by_player_id(player.player_id)
-
-        player_seeding_time_hours = player.seeding_time_balance // timedelta(hours=1)
-        self.logger.debug(
-            f'User "{ctx.author.name}/{player.player_id}" is attempting to claim {hours} seeder hours from their total of {player_seeding_time_hours:,}'
+        # Fetch the current VIP before locking the balance, the RCON is slow.
+        # Servers that don't answer are left to the outbox's retries.
+        community = self.community(ctx)
+        player = await self.get_player_by_discord_id(ctx.author.id)
+        vip = await self.get_latest_vip_by_player_id(
+            player.player_id, community, partial=True
         )
-        if hours > player_seeding_time_hours:
+
+        try:
+            player, grant = await self.claim_vip(ctx.author, hours, vip, community)
+        except CONTENTION_ERRORS:
             raise EphemeralMentionError(
-                f"❌ Sorry, not enough banked time to claim `{hours}` hour(s) of VIP (Currently have `{player_seeding_time_hours:,}` banked hours)."
+                "Seeding balances are busy right now, please try your claim again."
             )
 
-        grant_value = global_config.seeder_vip_reward_hours * hours
-        if vip is None:
-            # !!! vip expiration is in utc...
-            expiration = datetime.now(timezone.utc) + timedelta(hours=grant_value)
-        else:
-            # Check if current expiration is in the past.  If it is, set it to current time.
-            cur_expiration = datetime.fromisoformat(vip)
-            if cur_expiration < datetime.now(timezone.utc):
-                cur_expiration = datetime.now(timezone.utc)
-
-            expiration = cur_expiration + timedelta(hours=grant_value)
-
-        if expiration >= datetime(year=3000, month=1, day=1, tzinfo=timezone.utc):
+        if grant is None:
             # non-expiring vip... converting seeding hours is pointless...
             message = ("Your VIP does not expire... no need to convert seeding hours!",)
-
         else:
-            # Make sure all RCON grants are successful.
-            result_dict = await self.client.grant_vip(
-                player.player_name, player.player_id, expiration
-            )
-            if not all(result_dict.values()):
-                raise EphemeralMentionError(
-                    "There was a problem on one of the servers assigning your VIP."
-                )
-
-            # !!! should only decrease banked seeding time if it is actually used...
-            player.seeding_time_balance -= timedelta(hours=hours)
-
             message = (
-                f"{ctx.author.mention}: You've added `{grant_value}` hour(s) to your VIP status.",
-                f"Your VIP expires <t:{int(expiration.timestamp())}:R>",
+                f"{ctx.author.mention}: You've added `{community.seeder_vip_reward_hours * hours}` hour(s) to your VIP status.",
+                f"Your VIP will expire <t:{int(grant.expiration.timestamp())}:R>, I'll let you know once every server has it.",
             )
-            await player.save(update_fields=["seeding_time_balance"])
 
         message += (
             f"Your remaining seeder balance is `{player.seeding_time_balance // timedelta(hours=1):,}` hour(s).",
@@ -205,6 +287,84 @@ class HLLCommands(BotCommands):
         )
         await ctx.respond("\n".join(message), ephemeral=True)
 
+        # Deliver the VIP now, rather than on the next retry of the outbox
+        vip_grants = self.bot.get_cog("VIPGrants")
+        if grant is not None and vip_grants is not None:
+            vip_grants.submit(grant, ctx)
+
+    @retry_on_contention
+    @atomic()
+    async def claim_vip(
+        self,
+        user: discord.Member,
+        hours: int,
+        vip: datetime | None,
+        community: Community,
+    ) -> tuple[HLL_Player, VIP_Grant | None]:
+        """
+        Debit `hours` from the user's balance and queue the VIP on every server
+        of the community in the `VIP_Delivery` outbox, extending their latest
+        VIP expiration there.
+
+        Returns no grant for non-expiring VIP.
+        """
+        (player,) = await self.lock_players_by_discord_id(user.id, author_id=user.id)
+
+        player_seeding_time_hours = player.seeding_time_balance // timedelta(hours=1)
+        self.logger.debug(
+            f'User "{user.name}/{player.player_id}" is attempting to claim {hours} seeder hours from their total of {player_seeding_time_hours:,}'
+        )
+        if hours > player_seeding_time_hours:
+            raise EphemeralMentionError(
+                f"❌ Sorry, not enough banked time to claim `{hours}` hour(s) of VIP (Currently have `{player_seeding_time_hours:,}` banked hours)."
+            )
+
+        # !!! vip expiration is in utc...
+        # Extend from the latest of now, the servers' VIP, and the claims that
+        # didn't fail there, as `vip` was read before the lock and may predate
+        # a claim delivered since
+        now = datetime.now(timezone.utc)
+        latest = (
+            await VIP_Grant.filter(
+                hll_player=player,
+                deliveries__state__in=[DeliveryState.PENDING, DeliveryState.DONE],
+                deliveries__server__in=community.servers,
+            )
+            .order_by("-expiration")
+            .first()
+        )
+        start = max(
+            expiration
+            for expiration in (now, vip, latest and latest.expiration)
+            if expiration is not None
+        )
+        expiration = start + timedelta(hours=community.seeder_vip_reward_hours * hours)
+        if expiration >= datetime(year=3000, month=1, day=1, tzinfo=timezone.utc):
+            return player, None
+
+        await Seeding_Ledger.create(
+            hll_player=player,
+            kind=LedgerKind.CLAIM,
+            amount=-timedelta(hours=hours),
+            discord_id=user.id,
+        )
+        player.seeding_time_balance -= timedelta(hours=hours)
+
+        grant = await VIP_Grant.create(
+            hll_player=player,
+            player_name=player.player_name,
+            hours=hours,
+            expiration=expiration,
+            discord_id=user.id,
+        )
+        await VIP_Delivery.bulk_create(
+            [
+                VIP_Delivery(grant=grant, server=server, next_attempt=now)
+                for server in community.servers
+            ]
+        )
+        return player, grant
+
     @hll.command()
     @guild_only()
     @option("receiver_discord_user", description="Discord user to grant VIP hours to")
@@ -215,7 +375,6 @@ class HLLCommands(BotCommands):
         required=False,
         min_value=1,
     )
-    @atomic()
     async def gift(
         self,
         ctx: discord.ApplicationContext,
@@ -234,38 +393,59 @@ class HLLCommands(BotCommands):
         if receiver_discord_user == ctx.author:
             raise EphemeralMentionError("You can't gift to yourself.")
 
-        receiver = await self.get_player_by_discord_id(
-            receiver_discord_user.id, update=True, other=True
-        )
-        gifter = await self.get_player_by_discord_id(ctx.author.id, update=True)
-
-        gifter_seeding_time_hours = gifter.seeding_time_balance // timedelta(hours=1)
-        if hours > gifter_seeding_time_hours:
+        try:
+            gifter = await self.transfer_seeding_hours(
+                ctx.author, receiver_discord_user, hours
+            )
+        except CONTENTION_ERRORS:
             raise EphemeralMentionError(
-                f"❌ Sorry, not enough banked time to claim `{hours}` hour(s) of VIP (Currently have `{gifter_seeding_time_hours:,}` banked hours)."
+                "Seeding balances are busy right now, please try your gift again."
             )
 
-        self.logger.info(
-            f'User "{receiver}" is being gifted {hours} seeder hours by discord user {ctx.author.mention}.'
-        )
-
-        receiver.seeding_time_balance += timedelta(hours=hours)
-        gifter.seeding_time_balance -= timedelta(hours=hours)
-
         message = (
             f"{ctx.author.mention}: You've added `{hours}` hour(s) to {receiver_discord_user.mention}'s seeding bank.",
             f"Your remaining seeder balance is `{gifter.seeding_time_balance // timedelta(hours=1):,}` hour(s).",
             "💗 Thanks for seeding! 💗",
         )
-        await gifter.save(update_fields=["seeding_time_balance"])
-        await receiver.save(update_fields=["seeding_time_balance"])
-
         await ctx.send(
             f"{ctx.author.mention} just gifted `{hours}` hours of VIP seeding time to {receiver_discord_user.mention}!  Use {command_mention(self.seeder)} to check your balance."
         )
 
         await ctx.respond("\n".join(message), ephemeral=True)
 
+    @retry_on_contention
+    @atomic()
+    async def transfer_seeding_hours(
+        self, gifter_user: discord.Member, receiver_user: discord.Member, hours: int
+    ) -> HLL_Player:
+        """Move `hours` from the gifter's balance to the receiver's, returning the gifter."""
+        receiver, gifter = await self.lock_players_by_discord_id(
+            receiver_user.id, gifter_user.id, author_id=gifter_user.id
+        )
+
+        gifter_seeding_time_hours = gifter.seeding_time_balance // timedelta(hours=1)
+        if hours > gifter_seeding_time_hours:
+            raise EphemeralMentionError(
+                f"❌ Sorry, not enough banked time to claim `{hours}` hour(s) of VIP (Currently have `{gifter_seeding_time_hours:,}` banked hours)."
+            )
+
+        self.logger.info(
+            f'User "{receiver}" is being gifted {hours} seeder hours by discord user {gifter_user.mention}.'
+        )
+
+        for player, amount in (
+            (gifter, -timedelta(hours=hours)),
+            (receiver, timedelta(hours=hours)),
+        ):
+            await Seeding_Ledger.create(
+                hll_player=player,
+                kind=LedgerKind.GIFT,
+                amount=amount,
+                discord_id=gifter_user.id,
+            )
+            player.seeding_time_balance += amount
+        return gifter
+
     @hll_leaderboard.command()
     @option(
         "period",
@@ -289,10 +469,11 @@ class HLLCommands(BotCommands):
         timezone: str = global_config.leaderboard_default_timezone,
     ) -> None:
         """Show the period leaderboard for seeding time"""
-        start, end = parse_to_start_end(period, reference, timezone)
+        start, end = await parse_to_start_end(period, reference, timezone)
 
         await self._leaderboard(
             ctx,
+            self.community(ctx),
             start,
             end,
             f"{period.capitalize()} Seeding Leaderboard",
@@ -317,14 +498,16 @@ class HLLCommands(BotCommands):
 
         await self._leaderboard(
             ctx,
-            parse_datetime(start, global_config.leaderboard_default_timezone),
-            parse_datetime(end, global_config.leaderboard_default_timezone),
+            self.community(ctx),
+            await parse_datetime(start, global_config.leaderboard_default_timezone),
+            await parse_datetime(end, global_config.leaderboard_default_timezone),
             "Seeding Leaderboard",
         )
 
     async def _leaderboard(
         self,
         ctx: discord.ApplicationContext,
+        community: Community,
         start: datetime,
         end: datetime,
         title: str,
@@ -340,8 +523,9 @@ class HLLCommands(BotCommands):
 
         seeding_session = Seeding_Session.filter(
             end_time__gte=start,
+            server__in=community.servers,
             hll_player__hidden=False,
-        )
+        ).using_db(read_connection())
         if end < datetime.now(timezone.utc):
             seeding_session = seeding_session.filter(start_time__lt=end)
             end_func = Least("end_time", end)
@@ -349,17 +533,26 @@ class HLLCommands(BotCommands):
             end_func = F("end_time")
         duration = SumTypeChange(end_func - Greatest("start_time", start))
 
-        rows = (
-            await seeding_session.annotate(
+        seeding_session = (
+            seeding_session.annotate(
                 duration=DateTrunc(duration, "second"),
                 sessions=Count("hll_player_id"),
                 rank=RankOrderByDesc(duration),
             )
             .group_by("hll_player_id", "hll_player__player_name")
             .order_by("rank")
-            .limit(20)
-            .values_list(*columns.values())
         )
+
+        daily = await self._daily_totals(community, start, end)
+        if daily:
+            # Part of the period was compacted, so rank the players in python
+            rows = await seeding_session.values_list(
+                "hll_player_id", "hll_player__player_name", "sessions", "duration"
+            )
+            rows = rank_totals(daily + rows)[:20]
+        else:
+            rows = await seeding_session.limit(20).values_list(*columns.values())
+
         embed = discord.Embed(
             title=title,
             description=f"Starting at <t:{int(start.timestamp())}:s>",
@@ -375,6 +568,49 @@ class HLLCommands(BotCommands):
 
         await ctx.respond(embed=embed)
 
+    async def _daily_totals(
+        self, community: Community, start: datetime, end: datetime
+    ) -> list[tuple[int, str, int, timedelta]]:
+        """
+        Per player totals of the compacted seeding days between `start` and `end`
+        on the community's servers.
+
+        Days are stored in `leaderboard_default_timezone`, so a day counts if
+        its midnight there is within the period.
+        """
+        tz = zoneinfo.ZoneInfo(global_config.leaderboard_default_timezone)
+
+        def first_day(dt: datetime) -> date:
+            dt = dt.astimezone(tz)
+            if dt.time() == time():
+                return dt.date()
+            return dt.date() + timedelta(days=1)
+
+        rows = (
+            await Seeding_Session_Daily.filter(
+                day__gte=first_day(start),
+                day__lt=first_day(end),
+                server__in=community.servers,
+                hll_player__hidden=False,
+            )
+            .using_db(read_connection())
+            .annotate(
+                total_sessions=SumTypeChange("sessions"),
+                total_duration=SumTypeChange("duration"),
+            )
+            .group_by("hll_player_id", "hll_player__player_name")
+            .values_list(
+                "hll_player_id",
+                "hll_player__player_name",
+                "total_sessions",
+                "total_duration",
+            )
+        )
+        return [
+            (player_id, name, int(sessions), timedelta(microseconds=int(duration)))
+            for player_id, name, sessions, duration in rows
+        ]
+
 
 def setup(bot: HLLDiscordBot):
     bot.add_cog(HLLCommands(bot))
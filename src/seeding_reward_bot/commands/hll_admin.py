@@ -1,16 +1,34 @@
+import gzip
+import tempfile
+import zoneinfo
 from datetime import datetime, timedelta
 
 import discord
 from discord import guild_only
 from discord.commands import SlashCommandGroup, option
+from tortoise import connections
 from tortoise.transactions import atomic
 
 from seeding_reward_bot.commands.util import (
     BotCommands,
+    EphemeralError,
     add_embed_table,
+    parse_datetime,
+    time_to_seed,
 )
-from seeding_reward_bot.db import HLL_Player
+from seeding_reward_bot.config import global_config
+from seeding_reward_bot.db import (
+    HLL_Player,
+    LedgerKind,
+    Seeding_Ledger,
+    Server_Player_Count,
+    copy_seeding_sessions,
+    read_connection,
+    transfer_stats,
+)
+from seeding_reward_bot.db_backend import pool_stats
 from seeding_reward_bot.main import HLLDiscordBot
+from seeding_reward_bot.perf import TICK_PHASES, percentiles
 
 
 class HLLAdminCommands(BotCommands):
@@ -33,14 +51,20 @@ class HLLAdminCommands(BotCommands):
     ) -> None:
         """Admin-only command to grant user banked seeding time.  The user still must redeem the time."""
         await ctx.defer(ephemeral=True)
+        self.require_default_community(ctx)
         player = await self.get_player_by_discord_id(user.id, other=True, update=True)
         self.logger.info(
             f'User "{player.discord_id}/{player.player_id}" is being granted {hours} seeder hours by discord user {ctx.author.mention}.'
         )
 
         old_seed_balance = player.seeding_time_balance
+        await Seeding_Ledger.create(
+            hll_player=player,
+            kind=LedgerKind.GRANT,
+            amount=timedelta(hours=hours),
+            discord_id=ctx.author.id,
+        )
         player.seeding_time_balance += timedelta(hours=hours)
-        await player.save(update_fields=["seeding_time_balance"])
 
         message = (
             f"Successfully granted `{hours}` hour(s) to seeder {user.mention}",
@@ -76,18 +100,25 @@ class HLLAdminCommands(BotCommands):
         await self._check(ctx, player)
 
     async def _check(self, ctx: discord.ApplicationContext, player: HLL_Player) -> None:
-        vip = await self.get_vip_by_player_id(player.player_id, other=True)
+        community = self.community(ctx)
+        expiration = await self.get_latest_vip_by_player_id(
+            player.player_id, community, other=True
+        )
+        pending = await self.pending_vip_servers(player, community)
 
         self.logger.debug(
             f'User {ctx.author.mention} is inspecting player data for "{player.discord_id}/{player.player_id}"'
         )
 
         message = (f'Data for user "<@{player.discord_id}>/{player.discord_id}"',)
-        if vip is None:
+        if expiration is None:
             message += ("VIP expiration: user has no active VIP via the RCON server.",)
         else:
-            expiration = datetime.fromisoformat(vip)
             message += (f"VIP expiration: <t:{int(expiration.timestamp())}:R>",)
+        if pending:
+            message += (
+                f"VIP claim still being granted on server(s): {', '.join(map(str, pending))}",
+            )
         message += (
             f"Database player name: `{player.player_name}`",
             f"Database player ID: `{player.player_id}`",
@@ -109,6 +140,7 @@ class HLLAdminCommands(BotCommands):
     ) -> None:
         """Admin-only command to register a discord account to a Player ID"""
         await ctx.defer(ephemeral=True)
+        self.require_default_community(ctx)
 
         await self.register_player(ctx, player_id, user, other=True)
 
@@ -126,6 +158,7 @@ class HLLAdminCommands(BotCommands):
     ) -> None:
         """Admin-only command to unregister a discord account from a Player ID."""
         await ctx.defer(ephemeral=True)
+        self.require_default_community(ctx)
         player = await self.get_player_by_discord_id(user.id, other=True, update=True)
         self.logger.debug(
             f'User {ctx.author.mention} is unregistering "{player.discord_id}/{player.player_id}"'
@@ -167,6 +200,7 @@ class HLLAdminCommands(BotCommands):
     @atomic()
     async def _hide_player(self, ctx, player_id, hide=True) -> None:
         await ctx.defer(ephemeral=True)
+        self.require_default_community(ctx)
 
         player = await self.get_player_by_player_id(player_id, other=True, update=True)
         message = f"{player} ({player_id}) was "
@@ -189,7 +223,11 @@ class HLLAdminCommands(BotCommands):
             "Player Name": "player_name",
             "Player ID": "player_id",
         }
-        players = await HLL_Player.filter(hidden=True).values_list(*columns.values())
+        players = (
+            await HLL_Player.filter(hidden=True)
+            .using_db(read_connection())
+            .values_list(*columns.values())
+        )
 
         embed = discord.Embed(title="Players Hidden from Seeding Leaderboard")
         embed = add_embed_table(
@@ -201,6 +239,187 @@ class HLLAdminCommands(BotCommands):
 
         await ctx.respond(embed=embed, ephemeral=True)
 
+    @hll_admin.command()
+    @guild_only()
+    async def db_pool(self, ctx: discord.ApplicationContext) -> None:
+        """Admin-only command to show database pool usage, checkout waits and balance transfer contention"""
+        waits = pool_stats.percentiles()
+
+        message = ()
+        for name in connections.db_config:
+            size, idle, max_size = connections.get(name).pool_usage()
+            message += (
+                f"`{name}` connections in use: `{size - idle}` of `{size}` open (max `{max_size}`)",
+            )
+        message += (
+            f"Checkouts: `{pool_stats.count:,}` (`{pool_stats.slow:,}` slow)",
+            f"Checkout wait p50/p95/p99: `{waits['p50']:.3f}s` / `{waits['p95']:.3f}s` / `{waits['p99']:.3f}s`",
+            f"Checkout wait max: `{pool_stats.max:.3f}s`",
+        )
+        transfers = transfer_stats.percentiles()
+        message += (
+            f"Balance transfers: `{transfer_stats.count:,}` (`{transfer_stats.retries:,}` lock contention retries, `{transfer_stats.failures:,}` failed)",
+            f"Balance transfer p50/p95/p99: `{transfers['p50']:.3f}s` / `{transfers['p95']:.3f}s` / `{transfers['p99']:.3f}s`",
+        )
+        await ctx.respond("\n".join(message), ephemeral=True)
+
+    @hll_admin.command()
+    @guild_only()
+    async def perf(self, ctx: discord.ApplicationContext) -> None:
+        """Admin-only command to show timing percentiles of recent seeding ticks"""
+        await ctx.defer(ephemeral=True)
+
+        bot_tasks = self.bot.get_cog("BotTasks")
+        if bot_tasks is None:
+            raise EphemeralError(
+                "The seeding poller runs separately from the bot, no tick timings available."
+            )
+        servers = self.community(ctx).servers
+        timings = [
+            timing
+            for timing in bot_tasks.tick_timings
+            if global_config.rcon_url.get(timing.server) in servers
+        ]
+        if not timings:
+            raise EphemeralError("No seeding ticks have been recorded yet.")
+
+        rows = []
+        for phase in TICK_PHASES:
+            values = [getattr(timing, phase) for timing in timings]
+            cuts = percentiles(values)
+            rows.append(
+                (
+                    phase,
+                    f"{cuts['p50']:.3f}",
+                    f"{cuts['p95']:.3f}",
+                    f"{cuts['p99']:.3f}",
+                    f"{max(values):.3f}",
+                )
+            )
+        players = percentiles([timing.players for timing in timings])
+
+        embed = discord.Embed(
+            title="Seeding Tick Timings (seconds)",
+            description=f"Last `{len(timings)}` server ticks, players per tick p50/p95: `{players['p50']:.0f}` / `{players['p95']:.0f}`",
+        )
+        embed = add_embed_table(
+            embed,
+            headers=("Phase", "p50", "p95", "p99", "max"),
+            data=rows,
+            fmt="{:<9} {:>7} {:>7} {:>7} {:>7}",
+        )
+
+        await ctx.respond(embed=embed, ephemeral=True)
+
+    @hll_admin.command()
+    @guild_only()
+    @option(
+        "days",
+        input_type=int,
+        description="Number of days to chart",
+        required=False,
+        min_value=1,
+        max_value=28,
+    )
+    async def time_to_seed(
+        self, ctx: discord.ApplicationContext, days: int | None = None
+    ) -> None:
+        """Admin-only command to chart how long each server took to seed per day"""
+        await ctx.defer(ephemeral=True)
+
+        days = days or 14
+        community = self.community(ctx)
+        tz = zoneinfo.ZoneInfo(global_config.leaderboard_default_timezone)
+        now = datetime.now(tz)
+        start = datetime(now.year, now.month, now.day, tzinfo=tz) - timedelta(
+            days=days - 1
+        )
+        counts = (
+            await Server_Player_Count.filter(
+                time__gte=start, server__in=community.servers
+            )
+            .using_db(read_connection())
+            .order_by("server", "time")
+            .values_list("server", "time", "players_sum", "samples")
+        )
+        servers = time_to_seed(counts, tz, community.seeding_threshold)
+        if not servers:
+            raise EphemeralError("No server player counts have been recorded yet.")
+
+        def fmt_duration(duration: timedelta | None) -> str:
+            if duration is None:
+                return "not seeded"
+            minutes = int(duration / timedelta(minutes=1))
+            return f"{minutes // 60}h{minutes % 60:02}m"
+
+        embed = discord.Embed(
+            title="Time to Seed",
+            description=f"From the first count below `{community.seeding_threshold}` players each day (`{tz.key}`) until the server reached it",
+        )
+        for server, seeded in sorted(servers.items()):
+            longest = max((d for d in seeded.values() if d is not None), default=None)
+            rows = []
+            for day, duration in sorted(seeded.items()):
+                bar = ""
+                if duration is not None and longest:
+                    bar = "█" * max(1, round(10 * (duration / longest)))
+                rows.append((f"{day:%a %m/%d}", fmt_duration(duration), bar))
+            embed = add_embed_table(
+                embed,
+                headers=(f"Server {server}", "Seeded in", ""),
+                data=rows,
+                fmt="{:<9} {:>10} {}",
+            )
+
+        await ctx.respond(embed=embed, ephemeral=True)
+
+    @hll_admin.command()
+    @guild_only()
+    @option("start", description="Start date and time of the sessions to export")
+    @option("end", description="End date and time of the sessions to export")
+    async def export(
+        self, ctx: discord.ApplicationContext, start: str, end: str
+    ) -> None:
+        """Admin-only command to export seeding sessions and player balances as a gzipped CSV"""
+        await ctx.defer(ephemeral=True)
+
+        start_datetime = await parse_datetime(
+            start, global_config.leaderboard_default_timezone
+        )
+        end_datetime = await parse_datetime(
+            end, global_config.leaderboard_default_timezone
+        )
+
+        self.logger.info(
+            f"User {ctx.author.mention} is exporting seeding sessions from {start_datetime} to {end_datetime}"
+        )
+
+        filename = (
+            f"seeding_sessions_{start_datetime:%Y%m%d}-{end_datetime:%Y%m%d}.csv.gz"
+        )
+        with tempfile.TemporaryFile() as export_file:
+            with gzip.GzipFile(filename[:-3], mode="wb", fileobj=export_file) as gz:
+
+                async def write(chunk: bytes) -> None:
+                    gz.write(chunk)
+
+                await copy_seeding_sessions(
+                    start_datetime, end_datetime, self.community(ctx).servers, write
+                )
+
+            size = export_file.tell()
+            if size > ctx.guild.filesize_limit:
+                raise EphemeralError(
+                    f"The export is too large to upload ({size:,} bytes), try a shorter range."
+                )
+            export_file.seek(0)
+
+            await ctx.respond(
+                f"Seeding sessions from <t:{int(start_datetime.timestamp())}:f> to <t:{int(end_datetime.timestamp())}:f>",
+                file=discord.File(export_file, filename=filename),
+                ephemeral=True,
+            )
+
 
 def setup(bot: HLLDiscordBot):
     bot.add_cog(HLLAdminCommands(bot))
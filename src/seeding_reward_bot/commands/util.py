@@ -1,7 +1,8 @@
 import logging
+import time
 import zoneinfo
 from collections.abc import Iterable
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
 import dateparser
 import discord
@@ -10,6 +11,7 @@ from discord.ext import commands
 from pypika_tortoise import Order, analytics
 from pypika_tortoise.terms import Function as PypikaFunction
 from pypika_tortoise.terms import Term
+from tortoise import connections
 from tortoise.exceptions import DoesNotExist, IntegrityError
 from tortoise.expressions import (
     CombinedExpression,
@@ -19,9 +21,20 @@ from tortoise.expressions import (
 from tortoise.functions import Sum
 from tortoise.transactions import atomic
 
-from seeding_reward_bot.config import global_config
-from seeding_reward_bot.db import HLL_Player
+from seeding_reward_bot.cache import player_cache
+from seeding_reward_bot.config import Community, global_config
+from seeding_reward_bot.db import (
+    DeliveryState,
+    HLL_Player,
+    VIP_Delivery,
+    apply_ledger,
+    lock_players,
+    read_connection,
+)
+from seeding_reward_bot.eventloop import run_blocking
+from seeding_reward_bot.hll_rcon_client import HLL_RCON_Result
 from seeding_reward_bot.main import HLLDiscordBot
+from seeding_reward_bot.ratelimit import rate_limiter
 
 
 class EphemeralError(Exception):
@@ -42,9 +55,20 @@ def command_mention(cmd: discord.ApplicationCommand | None):
     return "`cmd unknown`"
 
 
-def parse_datetime(str_datetime: str, timezone: str) -> datetime:
-    parsed_datetime = dateparser.parse(
-        str_datetime, settings={"TIMEZONE": timezone, "RETURN_AS_TIMEZONE_AWARE": True}
+def describe_rcon_failures(results: dict[str, HLL_RCON_Result]) -> str:
+    """Describe which servers failed, e.g. `server 1 (error), server 2 (timed out)`."""
+    return ", ".join(
+        f"server {global_config.rcon_url[url]} ({'timed out' if result.timed_out else 'error'})"
+        for url, result in results.items()
+    )
+
+
+async def parse_datetime(str_datetime: str, timezone: str) -> datetime:
+    # dateparser is slow enough to hold up the event loop, parse on the executor
+    parsed_datetime = await run_blocking(
+        dateparser.parse,
+        str_datetime,
+        settings={"TIMEZONE": timezone, "RETURN_AS_TIMEZONE_AWARE": True},
     )
     if not parsed_datetime:
         message = (
@@ -59,11 +83,11 @@ def parse_datetime(str_datetime: str, timezone: str) -> datetime:
     return parsed_datetime
 
 
-def parse_to_start_end(
+async def parse_to_start_end(
     period: str, reference: str, timezone: str
 ) -> tuple[datetime, datetime]:
     tzinfo = zoneinfo.ZoneInfo(timezone)
-    ref_datetime = parse_datetime(reference, timezone)
+    ref_datetime = await parse_datetime(reference, timezone)
 
     match period:
         case "daily":
@@ -121,6 +145,62 @@ def add_embed_table(
     return embed
 
 
+def rank_totals(
+    rows: Iterable[tuple[int, str, int, timedelta]],
+) -> list[tuple[int, str, int, timedelta]]:
+    """
+    Sum `(player id, player name, sessions, duration)` rows per player and rank
+    them by duration like SQL's `RANK()`, returning `(rank, name, sessions, duration)`.
+    """
+    totals = {}
+    for player_id, name, sessions, duration in rows:
+        _, total_sessions, total_duration = totals.get(
+            player_id, (name, 0, timedelta())
+        )
+        totals[player_id] = (name, total_sessions + sessions, total_duration + duration)
+
+    ranked = sorted(totals.values(), key=lambda total: total[2], reverse=True)
+    rows = []
+    for i, (name, sessions, duration) in enumerate(ranked):
+        if i and duration == ranked[i - 1][2]:
+            rank = rows[-1][0]
+        else:
+            rank = i + 1
+        rows.append((rank, name, sessions, duration - duration % timedelta(seconds=1)))
+    return rows
+
+
+def time_to_seed(
+    rows: Iterable[tuple[int, datetime, int, int]],
+    tzinfo: zoneinfo.ZoneInfo,
+    threshold: int,
+) -> dict[int, dict[date, timedelta | None]]:
+    """
+    Time each server took to seed per day, from `(server, time, players sum,
+    samples)` player count rows ordered by server and time: from its first
+    count below `threshold` that day to its first count at or above it after.
+
+    Days the server was below the threshold but never seeded map to None, days
+    it never was below the threshold are left out.
+    """
+    servers = {}
+    for server, at, players_sum, samples in rows:
+        days = servers.setdefault(server, {})
+        day = at.astimezone(tzinfo).date()
+        below, seeded = days.get(day, (None, None))
+        if seeded is not None:
+            continue
+        if players_sum / samples < threshold:
+            if below is None:
+                days[day] = (at, None)
+        elif below is not None:
+            days[day] = (below, at - below)
+    return {
+        server: {day: seeded for day, (_, seeded) in days.items()}
+        for server, days in servers.items()
+    }
+
+
 class SumTypeChange(Sum):
     populate_field_object = False
 
@@ -157,6 +237,26 @@ class DateTrunc(Function):
     database_func = PypikaDateTrunc
 
 
+async def get_player(field: str, value: str | int, *, update: bool) -> HLL_Player:
+    """
+    Get the player by `field` ("player_id" or "discord_id") with its ledger
+    applied, locked for update on the primary or else from `player_cache`.
+    """
+    if update:
+        player = await HLL_Player.select_for_update(no_key=True).get(**{field: value})
+        await apply_ledger([player], connections.get("default"))
+        return player
+
+    player = player_cache.get(field, value)
+    if player is None:
+        player = (
+            await HLL_Player.all().using_db(read_connection()).get(**{field: value})
+        )
+        await apply_ledger([player], read_connection())
+        player_cache.put(player)
+    return player
+
+
 class BotCommands(commands.Cog):
     """
     Cog to manage base discord interactions.
@@ -172,10 +272,7 @@ class BotCommands(commands.Cog):
         player_id: str, *, other: bool = False, update: bool = False
     ) -> HLL_Player:
         try:
-            hll_player = HLL_Player
-            if update:
-                hll_player = hll_player.select_for_update()
-            return await hll_player.get(player_id=player_id)
+            return await get_player("player_id", player_id, update=update)
         except DoesNotExist:
             message = f"There is no record for that Player ID `{player_id}`"
             if not other:
@@ -186,43 +283,116 @@ class BotCommands(commands.Cog):
         self, discord_id: int, *, other: bool = False, update: bool = False
     ) -> HLL_Player:
         try:
-            hll_player = HLL_Player
-            if update:
-                hll_player = hll_player.select_for_update()
-            return await hll_player.get(discord_id=discord_id)
+            return await get_player("discord_id", discord_id, update=update)
         except DoesNotExist:
-            message = f"Discord ID <@{discord_id}> is not registered. "
-            register_cmd = command_mention(
-                self.bot.get_application_command("hll register")
+            raise self.unregistered_error(discord_id, other=other)
+
+    async def lock_players_by_discord_id(
+        self, *discord_ids: int, author_id: int
+    ) -> list[HLL_Player]:
+        """
+        Lock the players of `discord_ids` for update in one query, see `lock_players`.
+        Returned in the order of `discord_ids`; the first one missing raises.
+        """
+        players = {
+            player.discord_id: player
+            for player in await lock_players(discord_id__in=discord_ids)
+        }
+        for discord_id in discord_ids:
+            if discord_id not in players:
+                raise self.unregistered_error(discord_id, other=discord_id != author_id)
+        return [players[discord_id] for discord_id in discord_ids]
+
+    def unregistered_error(self, discord_id: int, *, other: bool) -> EphemeralError:
+        message = f"Discord ID <@{discord_id}> is not registered. "
+        register_cmd = command_mention(self.bot.get_application_command("hll register"))
+        if not other:
+            message += f"Use {register_cmd} to tie your Player ID to your discord."
+        else:
+            message += f"Inform them to use {register_cmd} to tie their Player ID to their discord."
+        return EphemeralError(message)
+
+    @staticmethod
+    def community(ctx: discord.ApplicationContext) -> Community:
+        """The community of the guild the command was used in."""
+        return global_config.community(ctx.guild_id)
+
+    def require_default_community(self, ctx: discord.ApplicationContext) -> None:
+        """
+        Registrations, hidden players and seeding balances are shared by every
+        community, so only admins of the default community may change them.
+        """
+        if self.community(ctx) is not global_config.default_community:
+            raise EphemeralError(
+                "Players and seeding balances are shared by every community, this command can only be used in the guild of the default community."
             )
-            if not other:
-                message += f"Use {register_cmd} to tie your Player ID to your discord."
-            else:
-                message += f"Inform them to use {register_cmd} to tie their Player ID to their discord."
-            raise EphemeralError(message)
 
-    async def get_vip_by_player_id(self, player_id: str, *, other: bool = False) -> str:
-        # We need to ensure we get the same VIP states for both RCON's.
-        try:
-            vip_dict = await self.client.get_vip(player_id)
-        except Exception:
+    async def fetch_vips(
+        self,
+        player_id: str,
+        community: Community,
+        *,
+        other: bool = False,
+        partial: bool = False,
+    ) -> set[str]:
+        """
+        The distinct VIP expirations of `player_id` on the community's RCON
+        servers.  With `partial`, the servers that failed are left out unless
+        every server did.
+        """
+        vip_dict = await self.client.get_vip(player_id, community=community)
+
+        failed = {url: result for url, result in vip_dict.items() if not result.ok}
+        if failed and partial and len(failed) < len(vip_dict):
+            self.logger.warning(
+                f"Leaving out the VIP of {player_id} on {describe_rcon_failures(failed)}"
+            )
+        elif failed:
             message = "There was an error fetching "
             if other:
                 message += f"the current VIP status for player ({player_id})"
             else:
                 message += "your current VIP status"
-            message += " from one of the servers, try again later"
+            message += f" from {describe_rcon_failures(failed)}, try again later"
             raise EphemeralMentionError(message)
 
-        vip_set = set(vip_dict.values())
-        if len(vip_set) != 1:
-            # VIP from all RCON's didn't match, notify.
-            raise EphemeralAdminError(
-                f"VIP status is different between servers for {player_id=}"
-            )
+        return {result.value for result in vip_dict.values() if result.ok}
 
-        # All is well, return to the (identical) first in the list
-        return vip_set.pop()
+    async def get_latest_vip_by_player_id(
+        self,
+        player_id: str,
+        community: Community,
+        *,
+        other: bool = False,
+        partial: bool = False,
+    ) -> datetime | None:
+        """
+        Latest VIP expiration of `player_id` on the community's RCON servers,
+        which differ while a claim is being delivered.  None without VIP.
+        """
+        vips = [
+            datetime.fromisoformat(vip)
+            for vip in await self.fetch_vips(
+                player_id, community, other=other, partial=partial
+            )
+            if vip
+        ]
+        return max(vips, default=None)
+
+    async def pending_vip_servers(
+        self, player: HLL_Player, community: Community
+    ) -> list[int]:
+        """The community's servers still to be granted a claim of `player`."""
+        servers = (
+            await VIP_Delivery.filter(
+                grant__hll_player=player,
+                state=DeliveryState.PENDING,
+                server__in=community.servers,
+            )
+            .using_db(read_connection())
+            .values_list("server", flat=True)
+        )
+        return sorted(set(servers))
 
     @atomic()
     async def register_player(
@@ -282,6 +452,23 @@ class BotCommands(commands.Cog):
         )
         await ctx.respond("\n".join(message), ephemeral=True)
 
+    async def cog_before_invoke(self, ctx: discord.ApplicationContext) -> None:
+        """Apply the `RATE_LIMITS` of the command"""
+        name = ctx.command.qualified_name
+        retry_after, is_global = rate_limiter.acquire(name, ctx.author.id)
+        if not retry_after:
+            return
+
+        retry_at = int(time.time() + retry_after) + 1
+        self.logger.debug(
+            f"Rate limited {name} for {ctx.author.name}/{ctx.author.id} ({is_global=}) for {retry_after:.1f}s"
+        )
+        if is_global:
+            message = f"⏳ `/{name}` is in high demand right now, please try again <t:{retry_at}:R>."
+        else:
+            message = f"⏳ Slow down! You can use `/{name}` again <t:{retry_at}:R>."
+        raise EphemeralError(message)
+
     async def cog_command_error(
         self, ctx: discord.ApplicationContext, error: Exception
     ) -> None:
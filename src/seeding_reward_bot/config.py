@@ -1,18 +1,152 @@
+import dataclasses
+import logging
+from datetime import time
+
+from discord import Intents, MemberCacheFlags
 from environs import Env, ValidationError, validate
 
+rcon_url_validator = validate.URL(schemes=("http", "https"), require_tld=False)
+
+
+def rcon_urls(urls: dict) -> dict[str, int]:
+    """RCON server numbers by URL, from a `COMMUNITIES` entry."""
+    rcon_url = {str(url): int(server) for url, server in urls.items()}
+    if not rcon_url:
+        raise ValidationError("No RCON servers.")
+    for url in rcon_url:
+        rcon_url_validator(url)
+    return rcon_url
+
+
+def ranged_int(minimum: int, maximum: int | None = None):
+    def parse(value) -> int:
+        return validate.Range(min=minimum, max=maximum)(int(value))
+
+    return parse
+
+
+# Parsers of the settings a `COMMUNITIES` entry can override
+COMMUNITY_SETTINGS = {
+    "name": str,
+    "rcon_url": rcon_urls,
+    "rcon_api_key": str,
+    "seeding_threshold": ranged_int(0, 100),
+    "seeding_precheck_margin": ranged_int(0),
+    "seeder_reward_message": str,
+    "seeding_start_time_utc": time.fromisoformat,
+    "seeding_end_time_utc": time.fromisoformat,
+}
+
+
+@dataclasses.dataclass(frozen=True)
+class Community:
+    """
+    RCON servers and seeding rules of a community, serving the commands of its
+    Discord guild (every other guild for the default community).
+    """
+
+    name: str
+    guild_id: int | None
+    rcon_url: dict[str, int]
+    rcon_api_key: str
+    seeding_threshold: int
+    seeding_precheck_margin: int
+    seeder_vip_reward_hours: int
+    seeder_reward_message: str
+    seeding_start_time_utc: time
+    seeding_end_time_utc: time
+
+    @property
+    def servers(self) -> list[int]:
+        return list(self.rcon_url.values())
+
+    def configure(self, guild_id: str, settings: dict) -> "Community":
+        """The community of `guild_id`, with `settings` overriding this one's."""
+        if not isinstance(settings, dict):
+            raise ValidationError(f"Community {guild_id} is not a dict.")
+        # An hour seeded at any community can be claimed at every other one
+        if "seeder_vip_reward_hours" in settings:
+            raise ValidationError(
+                f"Community {guild_id} can't set seeder_vip_reward_hours, seeding balances are shared by every community."
+            )
+        if unknown := settings.keys() - COMMUNITY_SETTINGS.keys():
+            raise ValidationError(
+                f"Unknown settings {sorted(unknown)} for community {guild_id}."
+            )
+        if missing := {"rcon_url", "rcon_api_key"} - settings.keys():
+            raise ValidationError(
+                f"Missing settings {sorted(missing)} for community {guild_id}."
+            )
+        try:
+            values = {
+                name: COMMUNITY_SETTINGS[name](value)
+                for name, value in settings.items()
+            }
+            return dataclasses.replace(
+                self,
+                guild_id=int(guild_id),
+                **{"name": str(guild_id), **values},
+            )
+        except (TypeError, ValueError, AttributeError, ValidationError) as e:
+            raise ValidationError(f"Invalid community {guild_id}: {e}")
+
 
 class Configuration:
     def __init__(self):
-        rcon_url_validator = validate.URL(schemes=("http", "https"), require_tld=False)
-
         def json_dict_validator(json):
             if not isinstance(json, dict):
                 raise ValidationError("Not a dict.")
 
+        def rate_limits_validator(json):
+            json_dict_validator(json)
+            for limits in json.values():
+                json_dict_validator(limits)
+                for scope, limit in limits.items():
+                    if scope not in ("user", "global"):
+                        raise ValidationError(f'Unknown rate limit scope "{scope}".')
+                    # bool is an int, and fewer than 1 call can never be made
+                    if not (
+                        isinstance(limit, list)
+                        and len(limit) == 2
+                        and not any(isinstance(n, bool) for n in limit)
+                        and isinstance(limit[0], int)
+                        and limit[0] >= 1
+                        and isinstance(limit[1], int | float)
+                        and limit[1] > 0
+                    ):
+                        raise ValidationError(
+                            "Rate limits must be [calls, seconds], with a whole number of calls of at least 1."
+                        )
+
         env = Env(eager=False)
         env.read_env()
 
         self.log_level = env.log_level("LOG_LEVEL")
+        # Levels of individual loggers, like the tick's `seeding_reward_bot.tasks`
+        self.log_levels = {
+            name: logging.getLevelNamesMapping()[level.upper()]
+            for name, level in env.dict(
+                "LOG_LEVELS",
+                {"discord": "WARNING"},
+                subcast_values=str,
+                validate=lambda levels: all(
+                    level.upper() in logging.getLevelNamesMapping()
+                    for level in levels.values()
+                ),
+            ).items()
+        }
+        # Repeats of an error record within this many seconds are dropped, 0 keeps them
+        self.log_error_rate_limit = env.float(
+            "LOG_ERROR_RATE_LIMIT_SECONDS", 60.0, validate=validate.Range(min=0)
+        )
+        # Event loop stalls longer than this are logged with their stack, 0 disables
+        self.loop_stall_threshold = env.float(
+            "LOOP_STALL_THRESHOLD_SECONDS", 0.5, validate=validate.Range(min=0)
+        )
+        # Threads running CPU-bound work like date parsing off the event loop
+        self.blocking_executor_workers = env.int(
+            "BLOCKING_EXECUTOR_WORKERS", 2, validate=validate.Range(min=1)
+        )
 
         # Discord
         self.discord_token = env("DISCORD_TOKEN")
@@ -20,7 +154,35 @@ class Configuration:
         self.maintainer_discord_ids = env.list(
             "MAINTAINER_DISCORD_IDS", [], subcast=int
         )
+        # Token bucket [calls, seconds] per user and globally, by command name
+        self.rate_limits = env.json(
+            "RATE_LIMITS",
+            {
+                "hll vip": {"user": [3, 60], "global": [30, 60]},
+                "hll claim": {"user": [3, 60], "global": [30, 60]},
+                "hll leaderboard show": {"user": [3, 60], "global": [20, 60]},
+                "hll leaderboard show_range": {"user": [2, 60], "global": [10, 60]},
+                "hll-admin export": {"global": [2, 60]},
+            },
+            validate=rate_limits_validator,
+        )
         self.help_embed = env.json("HELP_EMBED", {}, validate=json_dict_validator)
+        # Gateway intents, slash commands only need guilds
+        self.discord_intents = env.list(
+            "DISCORD_INTENTS",
+            ["guilds"],
+            validate=validate.ContainsOnly(Intents.VALID_FLAGS),
+        )
+        # Messages kept in the client's cache, 0 disables it
+        self.discord_message_cache_size = env.int(
+            "DISCORD_MESSAGE_CACHE_SIZE", 0, validate=validate.Range(min=0)
+        )
+        # Member cache flags, members are cached only for these reasons
+        self.discord_member_cache = env.list(
+            "DISCORD_MEMBER_CACHE",
+            [],
+            validate=validate.ContainsOnly(MemberCacheFlags.VALID_FLAGS),
+        )
 
         # Database Details
         self.db_user = env("DB_USER")
@@ -28,6 +190,41 @@ class Configuration:
         self.db_host = env("DB_HOST")
         self.db_port = env.int("DB_PORT")
         self.db_name = env("DB_NAME")
+        # Optional read replica, sharing the primary's credentials
+        self.db_replica_host = env("DB_REPLICA_HOST", None)
+        self.db_replica_port = env.int("DB_REPLICA_PORT", self.db_port)
+        self.db_pool_min_size = env.int(
+            "DB_POOL_MIN_SIZE", 1, validate=validate.Range(min=0)
+        )
+        self.db_pool_max_size = env.int(
+            "DB_POOL_MAX_SIZE", 5, validate=validate.Range(min=1)
+        )
+        self.db_max_inactive_connection_lifetime = env.float(
+            "DB_MAX_INACTIVE_CONNECTION_LIFETIME_SECONDS",
+            300.0,
+            validate=validate.Range(min=0),
+        )
+        # 0 disables the server side statement timeout
+        self.db_statement_timeout = env.float(
+            "DB_STATEMENT_TIMEOUT_SECONDS", 0, validate=validate.Range(min=0)
+        )
+        self.db_command_query_timeout = env.float(
+            "DB_COMMAND_QUERY_TIMEOUT_SECONDS", 10.0, validate=validate.Range(min=0)
+        )
+        self.db_tick_query_timeout = env.float(
+            "DB_TICK_QUERY_TIMEOUT_SECONDS", 5.0, validate=validate.Range(min=0)
+        )
+        self.db_pool_wait_warning = env.float(
+            "DB_POOL_WAIT_WARNING_SECONDS", 1.0, validate=validate.Range(min=0)
+        )
+        # In-process cache of player records for read-only commands, 0 disables it
+        self.player_cache_size = env.int(
+            "PLAYER_CACHE_SIZE", 1000, validate=validate.Range(min=0)
+        )
+        # Cached records expire to pick up writes from a separate seeding poller
+        self.player_cache_ttl = env.float(
+            "PLAYER_CACHE_TTL_SECONDS", 60.0, validate=validate.Range(min=0)
+        )
 
         # Hell Let Loose
         self.rcon_url = env.dict(
@@ -37,21 +234,118 @@ class Configuration:
             validate=lambda items: all(rcon_url_validator(item) for item in items),
         )
         self.rcon_api_key = env("RCON_API_KEY")
+        # Record all RCON traffic to this file, or replay it instead of the network
+        self.rcon_record_file = env("RCON_RECORD_FILE", None)
+        self.rcon_replay_file = env("RCON_REPLAY_FILE", None)
+        # Replay speed-up of the recorded RCON latencies and seeding tick interval, 0 is unthrottled
+        self.rcon_replay_speed = env.float(
+            "RCON_REPLAY_SPEED", 1.0, validate=validate.Range(min=0)
+        )
+        # Seconds all RCON servers get to reply to commands like /hll vip and /hll claim
+        self.rcon_fanout_deadline = env.float(
+            "RCON_FANOUT_DEADLINE_SECONDS",
+            10.0,
+            validate=validate.Range(min=0, min_inclusive=False),
+        )
         self.seeding_threshold = env.int(
             "SEEDING_THRESHOLD", validate=validate.Range(min=0, max=100)
         )
+        # Servers this many players above the threshold skip fetching the player list
+        self.seeding_precheck_margin = env.int(
+            "SEEDING_PRECHECK_MARGIN", 5, validate=validate.Range(min=0)
+        )
         self.seeder_vip_reward_hours = env.int(
             "SEEDER_VIP_REWARD_HOURS", validate=validate.Range(min=0)
         )
         self.seeder_reward_message = env("SEEDER_REWARD_MESSAGE")
         self.seeding_start_time_utc = env.time("SEEDING_START_TIME_UTC")
         self.seeding_end_time_utc = env.time("SEEDING_END_TIME_UTC")
+        # Further communities by Discord guild ID, overriding the RCON servers and
+        # seeding rules above, see `Community`
+        communities = env.json("COMMUNITIES", {}, validate=json_dict_validator)
         self.allow_messages_to_players = env.bool("ALLOW_MESSAGES_TO_PLAYERS")
+        # Seeders missing from the server for up to this long keep their session
+        self.seeding_session_grace_minutes = env.int(
+            "SEEDING_SESSION_GRACE_MINUTES", 10, validate=validate.Range(min=0)
+        )
+        # Sessions older than this are compacted into daily totals, 0 keeps them all
+        self.seeding_session_retention_months = env.int(
+            "SEEDING_SESSION_RETENTION_MONTHS", 0, validate=validate.Range(min=0)
+        )
+        self.seeding_session_compaction_batch_size = env.int(
+            "SEEDING_SESSION_COMPACTION_BATCH_SIZE",
+            5000,
+            validate=validate.Range(min=1),
+        )
+        # Disable to run the seeding poller as its own `seedbot-poller` process
+        self.seeding_poller_in_bot = env.bool("SEEDING_POLLER_IN_BOT", True)
         self.leaderboard_default_timezone = env(
             "LEADERBOARD_DEFAULT_TIMEZONE"
         )  # https://en.wikipedia.org/wiki/List_of_tz_database_time_zones
 
+        # Health endpoint, disabled when HEALTH_PORT is 0
+        self.health_host = env("HEALTH_HOST", "0.0.0.0")
+        self.health_port = env.int(
+            "HEALTH_PORT", 0, validate=validate.Range(min=0, max=65535)
+        )
+        # Unhealthy once a seeding tick hasn't completed for this many intervals
+        self.health_tick_lag_multiple = env.float(
+            "HEALTH_TICK_LAG_MULTIPLE", 3.0, validate=validate.Range(min=1)
+        )
+        self.health_rcon_failure_threshold = env.int(
+            "HEALTH_RCON_FAILURE_THRESHOLD", 3, validate=validate.Range(min=1)
+        )
+
         env.seal()
 
+        # The settings above are the default community, serving every guild
+        # without a community of its own
+        self.default_community = Community(
+            name="default",
+            guild_id=None,
+            rcon_url=self.rcon_url,
+            rcon_api_key=self.rcon_api_key,
+            seeding_threshold=self.seeding_threshold,
+            seeding_precheck_margin=self.seeding_precheck_margin,
+            seeder_vip_reward_hours=self.seeder_vip_reward_hours,
+            seeder_reward_message=self.seeder_reward_message,
+            seeding_start_time_utc=self.seeding_start_time_utc,
+            seeding_end_time_utc=self.seeding_end_time_utc,
+        )
+        self.communities = [self.default_community] + [
+            self.default_community.configure(guild_id, settings)
+            for guild_id, settings in communities.items()
+        ]
+        self.guild_communities = {
+            community.guild_id: community for community in self.communities[1:]
+        }
+
+        # Every RCON server of every community, by URL; servers are numbered
+        # uniquely across the communities
+        self.rcon_url = {}
+        self.server_communities = {}
+        for community in self.communities:
+            if not community.rcon_url:
+                raise ValidationError(
+                    f'Community "{community.name}" has no RCON servers.'
+                )
+            for rcon_server_url, server in community.rcon_url.items():
+                if rcon_server_url in self.rcon_url:
+                    raise ValidationError(
+                        f'RCON "{rcon_server_url}" is configured twice.'
+                    )
+                if server in self.server_communities:
+                    raise ValidationError(f"Server number {server} is used twice.")
+                self.rcon_url[rcon_server_url] = server
+                self.server_communities[server] = community
+
+    def community(self, guild_id: int | None) -> Community:
+        """The community serving the Discord guild `guild_id`."""
+        return self.guild_communities.get(guild_id, self.default_community)
+
+    def server_community(self, rcon_server_url: str) -> Community:
+        """The community `rcon_server_url` belongs to."""
+        return self.server_communities[self.rcon_url[rcon_server_url]]
+
 
 global_config = Configuration()
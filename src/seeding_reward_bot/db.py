@@ -1,22 +1,53 @@
-from tortoise import Tortoise, fields
+import asyncio
+import logging
+import random
+import time
+import zoneinfo
+from collections import deque
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timedelta, timezone
+from enum import StrEnum
+from functools import wraps
+
+import asyncpg
+from tortoise import BaseDBAsyncClient, Tortoise, connections, fields
 from tortoise.indexes import PartialIndex
 from tortoise.models import Model
 
 from seeding_reward_bot.config import global_config
+from seeding_reward_bot.perf import percentiles
+
+logger = logging.getLogger(__name__)
 
 TORTOISE_MODELS = ["aerich.models", "seeding_reward_bot.db"]
-TORTOISE_ORM = {
-    "connections": {
-        "default": {
-            "engine": "tortoise.backends.asyncpg",
-            "credentials": {
-                "host": global_config.db_host,
-                "port": global_config.db_port,
-                "user": global_config.db_user,
-                "password": global_config.db_password,
-                "database": global_config.db_name,
+
+
+def _connection(host: str, port: int, **server_settings) -> dict:
+    return {
+        "engine": "seeding_reward_bot.db_backend",
+        "credentials": {
+            "host": host,
+            "port": port,
+            "user": global_config.db_user,
+            "password": global_config.db_password,
+            "database": global_config.db_name,
+            "minsize": global_config.db_pool_min_size,
+            "maxsize": global_config.db_pool_max_size,
+            "max_inactive_connection_lifetime": global_config.db_max_inactive_connection_lifetime,
+            "command_timeout": global_config.db_command_query_timeout or None,
+            "server_settings": {
+                "statement_timeout": str(
+                    int(global_config.db_statement_timeout * 1000)
+                ),
+                **server_settings,
             },
         },
+    }
+
+
+TORTOISE_ORM = {
+    "connections": {
+        "default": _connection(global_config.db_host, global_config.db_port),
     },
     "apps": {
         "seedbot": {
@@ -25,10 +56,412 @@ TORTOISE_ORM = {
         },
     },
 }
+if global_config.db_replica_host:
+    # Read-only commands are routed here, see `read_connection()`
+    TORTOISE_ORM["connections"]["replica"] = _connection(
+        global_config.db_replica_host,
+        global_config.db_replica_port,
+        default_transaction_read_only="on",
+    )
+
+
+def read_connection() -> BaseDBAsyncClient:
+    """
+    Connection for read-only queries: the replica if one is configured, otherwise
+    the primary.  Anything that writes or locks rows must stay on the primary.
+    """
+    return connections.get("replica" if global_config.db_replica_host else "default")
+
+
+# Seconds - allowed duration of a `copy_seeding_sessions` export
+EXPORT_TIMEOUT = 300
+
+EXPORT_SEEDING_SESSIONS_SQL = """
+    SELECT
+        s.server,
+        s.start_time,
+        s.end_time,
+        p.player_id,
+        p.player_name,
+        p.discord_id,
+        p.hidden,
+        (p.seeding_time_balance + l.amount) / 1000000 AS seeding_time_balance_seconds,
+        (p.total_seeding_time + l.seeding) / 1000000 AS total_seeding_time_seconds
+    FROM seeding_session s
+    JOIN hll_player p ON p.id = s.hll_player_id
+    CROSS JOIN LATERAL (
+        SELECT
+            COALESCE(SUM(amount), 0)::BIGINT AS amount,
+            COALESCE(SUM(amount) FILTER (WHERE kind = 'seeding'), 0)::BIGINT AS seeding
+        FROM seeding_ledger
+        WHERE hll_player_id = p.id AND id > p.ledger_id
+    ) l
+    WHERE s.end_time >= $1 AND s.start_time < $2 AND s.server = ANY($3::INT[])
+    ORDER BY s.start_time, s.id
+"""
+
+
+async def copy_seeding_sessions(
+    start: datetime,
+    end: datetime,
+    servers: list[int],
+    output: Callable[[bytes], Awaitable],
+) -> None:
+    """
+    Stream the seeding sessions on `servers` overlapping `start` - `end`, joined
+    with their player, as CSV chunks to the `output` coroutine function using
+    `COPY ... TO STDOUT`, so the result is never held in memory.
+    """
+    async with read_connection().acquire_connection() as connection:
+        await connection.copy_from_query(
+            EXPORT_SEEDING_SESSIONS_SQL,
+            start,
+            end,
+            servers,
+            output=output,
+            format="csv",
+            header=True,
+            timeout=EXPORT_TIMEOUT,
+        )
+
+
+COMPACT_SEEDING_SESSIONS_SQL = """
+    WITH batch AS (
+        DELETE FROM seeding_session
+        WHERE id IN (
+            SELECT id FROM seeding_session
+            WHERE end_time < $1
+            ORDER BY id
+            LIMIT $2
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING hll_player_id, server, start_time, end_time
+    ), rollup AS (
+        INSERT INTO seeding_session_daily (hll_player_id, server, day, duration, sessions)
+        SELECT
+            b.hll_player_id,
+            b.server,
+            d.day::DATE,
+            SUM(
+                EXTRACT(
+                    EPOCH FROM LEAST(b.end_time, (d.day + INTERVAL '1 day') AT TIME ZONE $3)
+                    - GREATEST(b.start_time, d.day AT TIME ZONE $3)
+                ) * 1000000
+            )::BIGINT,
+            COUNT(*) FILTER (WHERE d.day = DATE_TRUNC('day', b.start_time AT TIME ZONE $3))
+        FROM batch b
+        CROSS JOIN LATERAL GENERATE_SERIES(
+            DATE_TRUNC('day', b.start_time AT TIME ZONE $3),
+            b.end_time AT TIME ZONE $3,
+            INTERVAL '1 day'
+        ) AS d(day)
+        GROUP BY 1, 2, 3
+        ON CONFLICT (hll_player_id, server, day) DO UPDATE SET
+            duration = seeding_session_daily.duration + EXCLUDED.duration,
+            sessions = seeding_session_daily.sessions + EXCLUDED.sessions
+    )
+    SELECT COUNT(*) FROM batch
+"""
+
+
+async def compact_seeding_sessions(cutoff: datetime, batch_size: int) -> int:
+    """
+    Roll up one batch of seeding sessions that ended before `cutoff` into
+    `Seeding_Session_Daily`, by day in `leaderboard_default_timezone`, deleting
+    them in the same statement.
+
+    Returns the number of sessions compacted, less than `batch_size` once done.
+    """
+    _, rows = await connections.get("default").execute_query(
+        COMPACT_SEEDING_SESSIONS_SQL,
+        [cutoff, batch_size, global_config.leaderboard_default_timezone],
+    )
+    return rows[0][0]
+
+
+RECORD_SEEDING_STATS_SQL = """
+    WITH hour AS (
+        INSERT INTO seeding_hour (hll_player_id, server, weekday, hour, duration)
+        VALUES ($1, $2, $3, $4, $5)
+        ON CONFLICT (hll_player_id, server, weekday, hour) DO UPDATE SET
+            duration = seeding_hour.duration + EXCLUDED.duration
+    )
+    INSERT INTO seeding_streak (hll_player_id, last_day, current_streak, longest_streak)
+    VALUES ($1, $6, 1, 1)
+    ON CONFLICT (hll_player_id) DO UPDATE SET
+        current_streak = CASE
+            WHEN seeding_streak.last_day = EXCLUDED.last_day - 1
+            THEN seeding_streak.current_streak + 1
+            ELSE 1
+        END,
+        longest_streak = GREATEST(
+            seeding_streak.longest_streak,
+            CASE
+                WHEN seeding_streak.last_day = EXCLUDED.last_day - 1
+                THEN seeding_streak.current_streak + 1
+                ELSE 1
+            END
+        ),
+        last_day = EXCLUDED.last_day
+    WHERE seeding_streak.last_day < EXCLUDED.last_day
+"""
+
+
+async def record_seeding_stats(
+    hll_player_id: int, server: int, at: datetime, duration: timedelta
+) -> None:
+    """
+    Add `duration` of seeding at `at` to the player's hour of day and weekday
+    totals and daily streak, in `leaderboard_default_timezone`.
+    """
+    local = at.astimezone(zoneinfo.ZoneInfo(global_config.leaderboard_default_timezone))
+    await connections.get("default").execute_query(
+        RECORD_SEEDING_STATS_SQL,
+        [
+            hll_player_id,
+            server,
+            local.weekday(),
+            local.hour,
+            duration // timedelta(microseconds=1),
+            local.date(),
+        ],
+    )
+
+
+DOWNSAMPLE_PLAYER_COUNTS_SQL = """
+    WITH moved AS (
+        DELETE FROM server_player_count
+        WHERE resolution = $1 AND time < $3
+        RETURNING server, time, samples, players_min, players_max, players_sum
+    )
+    INSERT INTO server_player_count
+        (server, time, resolution, samples, players_min, players_max, players_sum)
+    SELECT
+        server,
+        DATE_BIN(MAKE_INTERVAL(secs => $2::INT), time, TIMESTAMPTZ '2000-01-01 00:00:00+00'),
+        $2,
+        SUM(samples),
+        MIN(players_min),
+        MAX(players_max),
+        SUM(players_sum)
+    FROM moved
+    GROUP BY 1, 2
+    ON CONFLICT (server, resolution, time) DO UPDATE SET
+        samples = server_player_count.samples + EXCLUDED.samples,
+        players_min = LEAST(server_player_count.players_min, EXCLUDED.players_min),
+        players_max = GREATEST(server_player_count.players_max, EXCLUDED.players_max),
+        players_sum = server_player_count.players_sum + EXCLUDED.players_sum
+    RETURNING 1
+"""
+
+
+async def downsample_player_counts(
+    resolution: int, to_resolution: int, cutoff: datetime
+) -> int:
+    """
+    Merge the server player counts of `resolution` seconds from before `cutoff`
+    into buckets of `to_resolution` seconds.
+
+    Returns the number of buckets written.
+    """
+    written, _ = await connections.get("default").execute_query(
+        DOWNSAMPLE_PLAYER_COUNTS_SQL, [resolution, to_resolution, cutoff]
+    )
+    return written
+
+
+# Minutes - ledger entries are only folded into a balance snapshot once they are
+# older than this, so no transaction still inserting lower ids can be open
+LEDGER_SNAPSHOT_MARGIN = 5
+
+PLAYER_BALANCES_SQL = """
+    SELECT
+        p.id,
+        (p.seeding_time_balance + COALESCE(SUM(l.amount), 0))::BIGINT,
+        (
+            p.total_seeding_time
+            + COALESCE(SUM(l.amount) FILTER (WHERE l.kind = 'seeding'), 0)
+        )::BIGINT,
+        GREATEST(p.last_seed_check, MAX(l.created) FILTER (WHERE l.kind = 'seeding'))
+    FROM hll_player p
+    LEFT JOIN seeding_ledger l ON l.hll_player_id = p.id AND l.id > p.ledger_id
+    WHERE p.id = ANY($1)
+    GROUP BY p.id
+"""
+
+
+async def apply_ledger(
+    players: list["HLL_Player"], connection: BaseDBAsyncClient
+) -> None:
+    """
+    Bring the balance, total seeding time and last seed check of `players` up
+    to date with their ledger entries since the last snapshot, read in one
+    statement on `connection` so a concurrent snapshot can't be counted twice.
+
+    The updated fields are derived: they must never be saved back to the player.
+    """
+    if not players:
+        return
+    _, rows = await connection.execute_query(
+        PLAYER_BALANCES_SQL, [[player.pk for player in players]]
+    )
+    balances = {row[0]: row[1:] for row in rows}
+    for player in players:
+        balance, total, last_seed_check = balances[player.pk]
+        player.seeding_time_balance = timedelta(microseconds=balance)
+        player.total_seeding_time = timedelta(microseconds=total)
+        player.last_seed_check = last_seed_check
+
+
+SNAPSHOT_BALANCES_SQL = """
+    WITH bounds AS (
+        SELECT
+            (SELECT COALESCE(MAX(ledger_id), 0) FROM hll_player) AS low,
+            COALESCE(
+                (SELECT MIN(id) - 1 FROM seeding_ledger WHERE created >= $1),
+                (SELECT MAX(id) FROM seeding_ledger),
+                0
+            ) AS high
+    ), pending AS (
+        SELECT
+            l.hll_player_id,
+            MAX(l.id) AS ledger_id,
+            SUM(l.amount)::BIGINT AS amount,
+            COALESCE(SUM(l.amount) FILTER (WHERE l.kind = 'seeding'), 0)::BIGINT AS seeding,
+            MAX(l.created) FILTER (WHERE l.kind = 'seeding') AS last_seeding
+        FROM seeding_ledger l, bounds b
+        WHERE l.id > b.low AND l.id <= b.high
+        GROUP BY l.hll_player_id
+    ), locked AS (
+        SELECT id FROM hll_player
+        WHERE id IN (SELECT hll_player_id FROM pending)
+        ORDER BY id
+        FOR NO KEY UPDATE
+    )
+    UPDATE hll_player p SET
+        seeding_time_balance = p.seeding_time_balance + pending.amount,
+        total_seeding_time = p.total_seeding_time + pending.seeding,
+        last_seed_check = GREATEST(p.last_seed_check, pending.last_seeding),
+        ledger_id = pending.ledger_id
+    FROM pending
+    JOIN locked ON locked.id = pending.hll_player_id
+    WHERE p.id = pending.hll_player_id AND p.ledger_id < pending.ledger_id
+    RETURNING p.id
+"""
+
+
+async def snapshot_balances() -> int:
+    """
+    Fold the ledger entries older than `LEDGER_SNAPSHOT_MARGIN` into the balance
+    snapshots of their players.
+
+    Every entry up to the highest folded id is folded in the same statement, so
+    the highest `ledger_id` of any player bounds the entries left to scan.
+
+    Returns the number of players updated.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(minutes=LEDGER_SNAPSHOT_MARGIN)
+    updated, _ = await connections.get("default").execute_query(
+        SNAPSHOT_BALANCES_SQL, [cutoff]
+    )
+    return updated
+
+
+# Seconds a balance transfer waits for its row locks before the attempt is retried
+TRANSFER_LOCK_TIMEOUT = 2
+
+# Attempts of a balance transfer that fails on lock contention
+TRANSFER_ATTEMPTS = 3
+
+# Errors of a transaction losing out on lock contention, safe to retry
+CONTENTION_ERRORS = (asyncpg.TransactionRollbackError, asyncpg.LockNotAvailableError)
+
+
+class TransferStats:
+    """
+    Keeps track of balance transfer durations and their lock contention retries.
+    """
+
+    def __init__(self, maxlen: int = 1000):
+        self.recent = deque(maxlen=maxlen)
+        self.count = 0
+        self.retries = 0
+        self.failures = 0
+
+    def record(self, duration: float, attempts: int, failed: bool) -> None:
+        self.recent.append(duration)
+        self.count += 1
+        self.retries += attempts - 1
+        self.failures += failed
+
+    def percentiles(self) -> dict[str, float]:
+        return percentiles(self.recent)
+
+
+transfer_stats = TransferStats()
+
+
+def retry_on_contention(fn):
+    """
+    Decorator retrying an `atomic()` balance transfer up to `TRANSFER_ATTEMPTS`
+    times when it deadlocks, hits a serialization failure or times out waiting
+    for a row lock, recording it in `transfer_stats`.
+    """
+
+    @wraps(fn)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        for attempt in range(1, TRANSFER_ATTEMPTS + 1):
+            try:
+                result = await fn(*args, **kwargs)
+            except CONTENTION_ERRORS as e:
+                failed = attempt == TRANSFER_ATTEMPTS
+                logger.warning(
+                    f'Balance transfer "{fn.__name__}" attempt {attempt}/{TRANSFER_ATTEMPTS} failed on lock contention: {e!r}'
+                )
+                if failed:
+                    transfer_stats.record(time.perf_counter() - start, attempt, True)
+                    raise
+                await asyncio.sleep(random.uniform(0, 0.1 * 2**attempt))
+            else:
+                transfer_stats.record(time.perf_counter() - start, attempt, False)
+                return result
+
+    return wrapper
+
+
+async def lock_players(**filters) -> list["HLL_Player"]:
+    """
+    Lock every player matching `filters` with a single `SELECT ... FOR NO KEY UPDATE`
+    ordered by id, so concurrent transfers always lock rows in the same order and
+    can't deadlock each other, and apply their ledger entries.  Must run in an
+    `atomic()` transaction, whose lock waits are limited to `TRANSFER_LOCK_TIMEOUT`.
+    """
+    await connections.get("default").execute_script(
+        f"SET LOCAL lock_timeout = '{TRANSFER_LOCK_TIMEOUT}s'"
+    )
+    players = await (
+        HLL_Player.filter(**filters).select_for_update(no_key=True).order_by("id")
+    )
+    await apply_ledger(players, connections.get("default"))
+    return players
+
+
+# Set once `init()` has completed
+initialized = asyncio.Event()
+# Why `init()` failed, reported by the health endpoint
+init_error: Exception | None = None
 
 
 async def init():
-    await Tortoise.init(config=TORTOISE_ORM)
+    global init_error
+    try:
+        await Tortoise.init(config=TORTOISE_ORM)
+    except Exception as e:
+        logger.exception("Failed to initialize the database")
+        init_error = e
+        raise
+    initialized.set()
 
 
 async def close():
@@ -50,6 +483,7 @@ class HLL_Player(Model):
     discord_id = fields.BigIntField(
         description="Discord ID for player", null=True, unique=True
     )
+    # Snapshots as of `ledger_id`, see `apply_ledger`
     seeding_time_balance = fields.TimeDeltaField(
         description="Amount of unspent seeding hours"
     )
@@ -62,6 +496,10 @@ class HLL_Player(Model):
     hidden = fields.BooleanField(
         description="Player is hidden from stats", default=False
     )
+    ledger_id = fields.BigIntField(
+        description="Last seeding ledger entry included in the balance snapshot",
+        default=0,
+    )
 
     def __str__(self):
         if self.player_name is not None:
@@ -84,3 +522,164 @@ class Seeding_Session(Model):
     end_time = fields.DatetimeField(
         description="End time of seeding session", db_index=True
     )
+
+
+class Seeding_Session_Daily(Model):
+    """
+    Model representing a player's daily seeding time per server, compacted from old seeding sessions.
+    """
+
+    class Meta:
+        unique_together = ("hll_player", "server", "day")
+
+    hll_player = fields.ForeignKeyField("seedbot.HLL_Player", db_index=True)
+    server = fields.IntField(description="Server the seeding took place on")
+    day = fields.DateField(
+        description="Day (in the leaderboard timezone) of the seeding", db_index=True
+    )
+    duration = fields.TimeDeltaField(description="Time spent seeding during the day")
+    sessions = fields.IntField(
+        description="Number of seeding sessions started during the day"
+    )
+
+
+class Open_Seeding_Session(Model):
+    """
+    Model representing a seeder's open seeding session, restored when the seeding poller restarts.
+    """
+
+    class Meta:
+        unique_together = ("server", "player_id")
+
+    server = fields.IntField(description="Server the session is open on")
+    player_id = fields.TextField(description="Player ID of the seeder")
+    start_time = fields.DatetimeField(description="Start time of seeding session")
+    last_seen = fields.DatetimeField(description="Last time the seeder was seen")
+
+
+class LedgerKind(StrEnum):
+    SEEDING = "seeding"
+    GRANT = "grant"
+    CLAIM = "claim"
+    GIFT = "gift"
+
+
+class Seeding_Ledger(Model):
+    """
+    Model representing an append-only change to a player's seeding time balance.
+    """
+
+    class Meta:
+        indexes = (("hll_player", "id"),)
+
+    id = fields.BigIntField(primary_key=True)
+    hll_player = fields.ForeignKeyField("seedbot.HLL_Player")
+    kind = fields.CharEnumField(LedgerKind, description="Reason of the change")
+    amount = fields.TimeDeltaField(description="Change to the seeding time balance")
+    created = fields.DatetimeField(
+        description="Time of the change", auto_now_add=True, db_index=True
+    )
+    discord_id = fields.BigIntField(
+        description="Discord ID of the user making the change", null=True
+    )
+
+
+class Seeding_Hour(Model):
+    """
+    Model representing a player's seeding time per server, weekday and hour of day.
+    """
+
+    class Meta:
+        unique_together = ("hll_player", "server", "weekday", "hour")
+
+    hll_player = fields.ForeignKeyField("seedbot.HLL_Player", db_index=True)
+    server = fields.IntField(description="Server the seeding took place on")
+    weekday = fields.IntField(description="Weekday of the seeding, 0 is Monday")
+    hour = fields.IntField(description="Hour of day of the seeding")
+    duration = fields.TimeDeltaField(description="Time spent seeding")
+
+
+class Seeding_Streak(Model):
+    """
+    Model representing a player's streak of consecutive days seeding.
+    """
+
+    hll_player = fields.OneToOneField("seedbot.HLL_Player")
+    last_day = fields.DateField(description="Last day the player seeded")
+    current_streak = fields.IntField(
+        description="Consecutive days seeded up to last_day"
+    )
+    longest_streak = fields.IntField(
+        description="Longest streak of consecutive days seeded"
+    )
+
+
+class Server_Player_Count(Model):
+    """
+    Model representing a server's player count over time, downsampled as it ages.
+    """
+
+    class Meta:
+        unique_together = ("server", "resolution", "time")
+        indexes = (("server", "time"),)
+
+    server = fields.IntField(description="Server the players were counted on")
+    time = fields.DatetimeField(description="Time of the count, or start of its bucket")
+    resolution = fields.IntField(
+        description="Length of the bucket in seconds, 0 for a single count",
+        default=0,
+    )
+    samples = fields.IntField(description="Number of counts in the bucket", default=1)
+    players_min = fields.IntField(description="Lowest player count in the bucket")
+    players_max = fields.IntField(description="Highest player count in the bucket")
+    players_sum = fields.IntField(description="Sum of the player counts in the bucket")
+
+
+class DeliveryState(StrEnum):
+    PENDING = "pending"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class VIP_Grant(Model):
+    """
+    Model representing claimed VIP, delivered to every server through `VIP_Delivery`.
+    """
+
+    id = fields.BigIntField(primary_key=True)
+    hll_player = fields.ForeignKeyField("seedbot.HLL_Player", db_index=True)
+    player_name = fields.TextField(
+        description="Name the VIP is granted under", null=True
+    )
+    hours = fields.IntField(description="Seeding hours claimed")
+    expiration = fields.DatetimeField(
+        description="VIP expiration to set on the servers"
+    )
+    discord_id = fields.BigIntField(description="Discord ID of the claiming user")
+    created = fields.DatetimeField(description="Time of the claim", auto_now_add=True)
+    notified = fields.BooleanField(
+        description="Whether the user was told the outcome", default=False
+    )
+
+
+class VIP_Delivery(Model):
+    """
+    Model representing the outbox entry of a VIP grant for one server.
+    """
+
+    class Meta:
+        unique_together = ("grant", "server")
+        indexes = [
+            PartialIndex(fields=["next_attempt"], condition={"state": "pending"}),
+        ]
+
+    grant = fields.ForeignKeyField("seedbot.VIP_Grant", related_name="deliveries")
+    server = fields.IntField(description="Server to grant the VIP on")
+    state = fields.CharEnumField(
+        DeliveryState,
+        description="State of the delivery",
+        default=DeliveryState.PENDING,
+    )
+    attempts = fields.IntField(description="Failed attempts so far", default=0)
+    next_attempt = fields.DatetimeField(description="Time of the next attempt")
+    error = fields.TextField(description="Error of the last attempt", null=True)
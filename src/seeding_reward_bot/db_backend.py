@@ -0,0 +1,132 @@
+import contextvars
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import asyncpg
+from tortoise.backends.asyncpg.client import AsyncpgDBClient
+
+from seeding_reward_bot.config import global_config
+from seeding_reward_bot.perf import percentiles
+
+# Timeout (in seconds) applied to every query of the current context
+_query_timeout: contextvars.ContextVar[float | None] = contextvars.ContextVar(
+    "query_timeout", default=None
+)
+
+
+@contextmanager
+def query_timeout(timeout: float | None):
+    """
+    Apply `timeout` seconds to every query run within the block, including tasks
+    created from it.  Queries outside of any block, or in one with no (or a 0)
+    `timeout`, use the pool `command_timeout`.
+    """
+    # asyncpg fails a query right away on a timeout of 0
+    token = _query_timeout.set(timeout or None)
+    try:
+        yield
+    finally:
+        _query_timeout.reset(token)
+
+
+class PoolStats:
+    """
+    Keeps track of how long callers waited to check a connection out of the pool.
+    """
+
+    def __init__(self, maxlen: int = 1000):
+        self.logger = logging.getLogger(__name__)
+        self.recent = deque(maxlen=maxlen)
+        self.count = 0
+        self.slow = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, wait: float) -> None:
+        self.recent.append(wait)
+        self.count += 1
+        self.total += wait
+        self.max = max(self.max, wait)
+        if wait >= global_config.db_pool_wait_warning:
+            self.slow += 1
+            self.logger.warning("Waited %.3fs to check out a database connection", wait)
+
+    def percentiles(self) -> dict[str, float]:
+        return percentiles(self.recent)
+
+
+pool_stats = PoolStats()
+
+
+class TimedPool:
+    """
+    Thin wrapper around an `asyncpg.Pool` that records checkout wait times.
+
+    Only `await pool.acquire()` is supported, which is how tortoise acquires
+    connections; every other attribute is passed through to the real pool.
+    """
+
+    def __init__(self, pool: asyncpg.Pool):
+        self._pool = pool
+
+    def __getattr__(self, name):
+        return getattr(self._pool, name)
+
+    async def acquire(self, *, timeout=None):
+        start = time.perf_counter()
+        try:
+            return await self._pool.acquire(timeout=timeout)
+        finally:
+            pool_stats.record(time.perf_counter() - start)
+
+
+class QueryTimeoutConnection(asyncpg.Connection):
+    """
+    asyncpg connection that applies the timeout of the current `query_timeout` block.
+    """
+
+    async def execute(self, query, *args, timeout=None):
+        timeout = timeout or _query_timeout.get()
+        return await super().execute(query, *args, timeout=timeout)
+
+    async def executemany(self, command, args, *, timeout=None):
+        timeout = timeout or _query_timeout.get()
+        return await super().executemany(command, args, timeout=timeout)
+
+    async def fetch(self, query, *args, timeout=None, record_class=None):
+        timeout = timeout or _query_timeout.get()
+        return await super().fetch(
+            query, *args, timeout=timeout, record_class=record_class
+        )
+
+    async def fetchrow(self, query, *args, timeout=None, record_class=None):
+        timeout = timeout or _query_timeout.get()
+        return await super().fetchrow(
+            query, *args, timeout=timeout, record_class=record_class
+        )
+
+
+class SeedbotDBClient(AsyncpgDBClient):
+    """
+    asyncpg tortoise client with pool checkout timing and per-context query timeouts.
+    """
+
+    connection_class = QueryTimeoutConnection
+
+    def pool_usage(self) -> tuple[int, int, int]:
+        """Returns the (size, idle, max size) of the connection pool."""
+        if not self._pool:
+            return 0, 0, self.pool_maxsize
+        return (
+            self._pool.get_size(),
+            self._pool.get_idle_size(),
+            self._pool.get_max_size(),
+        )
+
+    async def create_pool(self, **kwargs) -> TimedPool:
+        return TimedPool(await super().create_pool(**kwargs))
+
+
+client_class = SeedbotDBClient
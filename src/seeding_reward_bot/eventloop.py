@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, TypeVar
+
+from seeding_reward_bot.config import global_config
+
+T = TypeVar("T")
+
+# Seconds - how often the event loop's responsiveness is checked
+LOOP_MONITOR_INTERVAL = 0.1
+
+_executor = ThreadPoolExecutor(
+    max_workers=global_config.blocking_executor_workers,
+    thread_name_prefix="seedbot-blocking",
+)
+# Bounds the calls handed to the executor, the rest wait on the event loop
+_executor_slots = asyncio.Semaphore(global_config.blocking_executor_workers)
+
+
+async def run_blocking(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run the CPU-bound `fn` on the bounded executor, keeping the event loop free
+    for Discord heartbeats and interaction acknowledgements meanwhile.
+    """
+    async with _executor_slots:
+        return await asyncio.get_running_loop().run_in_executor(
+            _executor, partial(fn, *args, **kwargs)
+        )
+
+
+class LoopMonitor:
+    """
+    Detects event loop stalls: a heartbeat task on the loop is checked by a
+    watchdog thread, which logs the stack of the loop thread (and its running
+    task) once the heartbeat is `LOOP_STALL_THRESHOLD_SECONDS` late.
+    """
+
+    def __init__(self, threshold: float):
+        self.logger = logging.getLogger(__name__)
+        self.threshold = threshold
+        self.beat = time.monotonic()
+        self.stalls = 0
+        self.longest = 0.0
+        self.last_stall: float | None = None
+
+    async def run(self) -> None:
+        """Run the heartbeat until cancelled, the watchdog thread follows it."""
+        if not self.threshold:
+            return
+        loop = asyncio.get_running_loop()
+        stopped = threading.Event()
+        watchdog = threading.Thread(
+            target=self.watch,
+            args=(loop, threading.get_ident(), stopped),
+            name="seedbot-loop-monitor",
+            daemon=True,
+        )
+        watchdog.start()
+        try:
+            while True:
+                self.beat = time.monotonic()
+                await asyncio.sleep(LOOP_MONITOR_INTERVAL)
+                lag = time.monotonic() - self.beat - LOOP_MONITOR_INTERVAL
+                if lag > self.threshold:
+                    self.stalls += 1
+                    self.longest = max(self.longest, lag)
+                    self.last_stall = time.time()
+                    self.logger.warning(f"Event loop was blocked for {lag:.3f}s")
+        finally:
+            stopped.set()
+
+    def watch(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        thread_id: int,
+        stopped: threading.Event,
+    ) -> None:
+        reported = None
+        while not stopped.wait(LOOP_MONITOR_INTERVAL):
+            beat = self.beat
+            if time.monotonic() - beat < self.threshold + LOOP_MONITOR_INTERVAL:
+                continue
+            if reported == beat:
+                continue
+            reported = beat
+
+            frame = sys._current_frames().get(thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else ""
+            task = asyncio.current_task(loop)
+            self.logger.warning(
+                "Event loop blocked for over %.3fs in task %s, at:\n%s",
+                self.threshold,
+                task.get_name() if task else None,
+                stack,
+            )
+
+    def report(self) -> dict:
+        return {
+            "stalls": self.stalls,
+            "longest": round(self.longest, 3),
+            "last_stall": self.last_stall,
+        }
+
+
+loop_monitor = LoopMonitor(global_config.loop_stall_threshold)
@@ -0,0 +1,178 @@
+import asyncio
+import json
+import logging
+import time
+from collections.abc import Iterable
+
+import discord
+from tortoise import connections
+
+from seeding_reward_bot import db
+from seeding_reward_bot.config import global_config
+from seeding_reward_bot.eventloop import loop_monitor
+from seeding_reward_bot.hll_rcon_client import HLL_RCON_Client
+
+
+class Health:
+    """
+    Tracks the state reported by the HTTP health endpoint, and warns when the
+    seeding tick stops running.
+
+    `GET /health` reports 503 when the tick lags, the database can't be reached
+    or the discord gateway is closed.  `GET /ready` reports 503 until the database
+    and the discord gateway (if any) are ready.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.gateway: discord.Client | None = None
+        self.client: HLL_RCON_Client | None = None
+        self.tick_interval: float | None = None
+        self.last_ticks: dict[str, float] = {}
+        self.lagging: set[str] = set()
+
+    def watch_ticks(self, rcon_server_urls: Iterable[str], interval: float) -> None:
+        """Start watching the seeding tick of each server, run every `interval` seconds."""
+        self.tick_interval = interval
+        now = time.monotonic()
+        for rcon_server_url in rcon_server_urls:
+            self.last_ticks[rcon_server_url] = now
+
+    def tick(self, rcon_server_url: str) -> None:
+        """Record a completed seeding tick for `rcon_server_url`."""
+        self.last_ticks[rcon_server_url] = time.monotonic()
+
+    def check_ticks(self) -> dict[str, dict]:
+        if not self.tick_interval:
+            return {}
+        now = time.monotonic()
+        max_lag = self.tick_interval * global_config.health_tick_lag_multiple
+        ticks = {}
+        for rcon_server_url, last_tick in self.last_ticks.items():
+            since = now - last_tick
+            lagging = since > max_lag
+            if lagging and rcon_server_url not in self.lagging:
+                self.logger.warning(
+                    f'Seeding tick for "{rcon_server_url}" has not completed in {since:.0f}s (limit {max_lag:.0f}s)'
+                )
+                self.lagging.add(rcon_server_url)
+            elif not lagging and rcon_server_url in self.lagging:
+                self.logger.info(f'Seeding tick for "{rcon_server_url}" recovered')
+                self.lagging.discard(rcon_server_url)
+            ticks[rcon_server_url] = {
+                "seconds_since_last_tick": round(since, 1),
+                "lagging": lagging,
+            }
+        return ticks
+
+    def check_gateway(self) -> str:
+        if self.gateway is None:
+            return "disabled"
+        if self.gateway.is_closed():
+            return "closed"
+        if self.gateway.is_ready():
+            return "ready"
+        return "connecting"
+
+    async def check_db(self) -> str:
+        if db.init_error is not None:
+            return "error"
+        if not db.initialized.is_set():
+            return "initializing"
+        try:
+            async with asyncio.timeout(5):
+                await connections.get("default").execute_query("SELECT 1")
+        except Exception as e:
+            self.logger.warning(f"Health check query failed: {e!r}")
+            return "error"
+        return "ok"
+
+    def check_rcon(self) -> dict[str, dict]:
+        if self.client is None:
+            return {}
+        threshold = global_config.health_rcon_failure_threshold
+        return {
+            rcon_server_url: {
+                "circuit": "open" if failures >= threshold else "closed",
+                "consecutive_failures": failures,
+            }
+            for rcon_server_url, failures in self.client.failures.items()
+        }
+
+    async def report(self) -> dict:
+        gateway = self.check_gateway()
+        database = await self.check_db()
+        ticks = self.check_ticks()
+        return {
+            "healthy": gateway != "closed"
+            and database != "error"
+            and not any(tick["lagging"] for tick in ticks.values()),
+            "ready": gateway in ("ready", "disabled") and database == "ok",
+            "discord": gateway,
+            "db": database,
+            "ticks": ticks,
+            "rcon": self.check_rcon(),
+            "loop": loop_monitor.report(),
+        }
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            async with asyncio.timeout(5):
+                request = await reader.readline()
+                # Skip the headers, we only care about the path
+                while await reader.readline() not in (b"\r\n", b"\n", b""):
+                    pass
+            path = request.decode("latin-1").split()[1:2]
+
+            if path == ["/health"]:
+                report = await self.report()
+                status = "200 OK" if report["healthy"] else "503 Service Unavailable"
+            elif path == ["/ready"]:
+                report = await self.report()
+                status = "200 OK" if report["ready"] else "503 Service Unavailable"
+            else:
+                report = {"error": "not found"}
+                status = "404 Not Found"
+
+            body = json.dumps(report).encode()
+            headers = (
+                f"HTTP/1.1 {status}",
+                "Content-Type: application/json",
+                f"Content-Length: {len(body)}",
+                "Connection: close",
+                "\r\n",
+            )
+            writer.write("\r\n".join(headers).encode() + body)
+            await writer.drain()
+        except Exception:
+            self.logger.exception("Failed to answer health request")
+        finally:
+            writer.close()
+
+    async def watchdog(self) -> None:
+        while True:
+            await asyncio.sleep(self.tick_interval or 60)
+            self.check_ticks()
+
+    async def serve(
+        self, client: HLL_RCON_Client, gateway: discord.Client | None = None
+    ) -> None:
+        """
+        Serve the health endpoint on `HEALTH_HOST`:`HEALTH_PORT` for `client`
+        and the optional discord `gateway`.
+        """
+        self.client = client
+        self.gateway = gateway
+        server = await asyncio.start_server(
+            self.handle, global_config.health_host, global_config.health_port
+        )
+        self.logger.info(
+            f"Serving health endpoint on {global_config.health_host}:{global_config.health_port}"
+        )
+        async with server:
+            await self.watchdog()
+
+
+health = Health()
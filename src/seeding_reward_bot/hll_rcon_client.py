@@ -1,16 +1,43 @@
 import asyncio
 import logging
+import time
+from dataclasses import dataclass
+from typing import Any
 
 import httpx
 import stamina
 
-from seeding_reward_bot.config import global_config
+from seeding_reward_bot.config import Community, global_config
+from seeding_reward_bot.eventloop import run_blocking
+from seeding_reward_bot.rcon_records import DECODERS, loads
+from seeding_reward_bot.rcon_replay import RCON_Recorder, RCON_Replay
+
+# Responses larger than this are decoded on the executor, see `run_blocking`
+LARGE_RESPONSE_BYTES = 64 * 1024
+
+# Results with more entries than this are decoded into records on the executor
+LARGE_RESULT_ENTRIES = 500
 
 
 class HLL_RCON_Error(Exception):
     pass
 
 
+@dataclass
+class HLL_RCON_Result:
+    """
+    Outcome of a method on a single RCON server, see `HLL_RCON_Client.for_each_rcon`.
+    """
+
+    value: Any = None
+    error: BaseException | None = None
+    timed_out: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and not self.timed_out
+
+
 class HLL_RCON_Client:
     """
     Represents connection to one or more https://github.com/MarechJ/hll_rcon_tool endpoints.
@@ -24,9 +51,28 @@ class HLL_RCON_Client:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self.client = httpx.AsyncClient()
+        # In flight GET requests by (server, query), see `get_rcon`
+        self.in_flight = {}
+        # Consecutive failed requests per RCON, reported by the health endpoint
+        self.failures = {
+            rcon_server_url: 0 for rcon_server_url in global_config.rcon_url
+        }
+        # RCONs whose get_slots is failing, logged once until it works again
+        self.slots_failing = set()
+        # Record or replay the RCON traffic, see `RCON_RECORD_FILE` and `RCON_REPLAY_FILE`
+        self.recorder = None
+        if global_config.rcon_record_file:
+            self.recorder = RCON_Recorder(global_config.rcon_record_file)
+        self.replay = None
+        if global_config.rcon_replay_file:
+            self.replay = RCON_Replay(
+                global_config.rcon_replay_file, global_config.rcon_replay_speed
+            )
 
     async def close(self):
         await self.client.aclose()
+        if self.recorder is not None:
+            self.recorder.close()
 
     @staticmethod
     def for_single_rcon(fn):
@@ -38,7 +84,9 @@ class HLL_RCON_Client:
 
         async def wrapper(self, rcon_server_url, *args):
             self.logger.debug(
-                f'Executing "{fn.__name__}" with RCON "{rcon_server_url}" as an endpoint...'
+                'Executing "%s" with RCON "%s" as an endpoint...',
+                fn.__name__,
+                rcon_server_url,
             )
             return await fn(self, rcon_server_url, *args)
 
@@ -52,36 +100,87 @@ class HLL_RCON_Client:
         function multiple times (once per server).
 
         Methods that call methods wrapped in this decorator should *always* expect a dict reply where the key of the
-        dict is the RCON URL and the value is the return of the function.
+        dict is the RCON URL and the value is an `HLL_RCON_Result` holding the return of the function,
+        or the error or timeout of that server.
 
-        Ideally this method is adapted later to handle comparison of the values from different RCON's via a standard reply
-        but for now the caller has to evaluate the returned dict themselves.
+        Servers are called concurrently and are given `deadline` seconds (default
+        `rcon_fanout_deadline`) to reply, so one slow or failing server doesn't
+        hold up or cancel the others.
+
+        Pass `community` to only call the servers of that community.
         """
 
-        async def wrapper(self, *args):
+        async def wrapper(
+            self,
+            *args,
+            deadline: float | None = None,
+            community: Community | None = None,
+        ):
+            if deadline is None:
+                deadline = global_config.rcon_fanout_deadline
+            servers = (
+                global_config.rcon_url if community is None else community.rcon_url
+            )
+
             tasks = {}
-            try:
-                async with asyncio.TaskGroup() as tg:
-                    for rcon_server_url in global_config.rcon_url:
-                        self.logger.debug(
-                            f'Executing "{fn.__name__}" with RCON "{rcon_server_url}" as an endpoint...'
-                        )
-                        tasks[rcon_server_url] = tg.create_task(
-                            fn(self, rcon_server_url, *args)
-                        )
-            except Exception:
-                raise
-            # We need to check if the return value is identical for each RCON.
-            # If it is not, error/alert to avoid deviant behavior.
-
-            return {url: task.result() for url, task in tasks.items()}
+            for rcon_server_url in servers:
+                self.logger.debug(
+                    'Executing "%s" with RCON "%s" as an endpoint...',
+                    fn.__name__,
+                    rcon_server_url,
+                )
+                tasks[rcon_server_url] = asyncio.create_task(
+                    fn(self, rcon_server_url, *args)
+                )
+            _, pending = await asyncio.wait(tasks.values(), timeout=deadline)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+            results = {}
+            for url, task in tasks.items():
+                if task in pending:
+                    self.logger.error(
+                        f'"{fn.__name__}" timed out after {deadline}s on RCON "{url}"'
+                    )
+                    results[url] = HLL_RCON_Result(timed_out=True)
+                elif task.exception() is not None:
+                    self.logger.error(
+                        f'"{fn.__name__}" failed on RCON "{url}"',
+                        exc_info=task.exception(),
+                    )
+                    results[url] = HLL_RCON_Result(error=task.exception())
+                else:
+                    results[url] = HLL_RCON_Result(value=task.result())
+            return results
 
         return wrapper
 
-    @stamina.retry(on=httpx.HTTPError)
     async def request_rcon(self, method, server, query, json=None):
+        start = time.time()
+        try:
+            if self.replay is not None:
+                result = await self.replay.request(method, server, query)
+            else:
+                result = await self._request_rcon(method, server, query, json)
+        except Exception as e:
+            self.failures[server] = self.failures.get(server, 0) + 1
+            if self.recorder is not None:
+                self.recorder.record(
+                    start, time.time() - start, method, server, query, json, error=e
+                )
+            raise
+        self.failures[server] = 0
+        if self.recorder is not None:
+            self.recorder.record(
+                start, time.time() - start, method, server, query, json, result=result
+            )
+        return result
+
+    @stamina.retry(on=httpx.HTTPError)
+    async def _request_rcon(self, method, server, query, json=None):
         headers = {
-            "Authorization": f"bearer {global_config.rcon_api_key}",
+            "Authorization": f"bearer {global_config.server_community(server).rcon_api_key}",
             "Connection": "keep-alive",
             "Content-Type": "application/json",
         }
@@ -93,46 +192,77 @@ class HLL_RCON_Client:
             timeout=httpx.Timeout(15.0, read=None),
         )
         response.raise_for_status()
-        r = response.json()
+        if len(response.content) > LARGE_RESPONSE_BYTES:
+            r = await run_blocking(loads, response.content)
+        else:
+            r = loads(response.content)
         if r["failed"]:
             raise HLL_RCON_Error(f'RCON query failed!: "{r}"')
         return r["result"]
 
     async def get_rcon(self, server, query):
-        return await self.request_rcon("GET", server, query)
+        """
+        GET `query` from `server`, decoded into records by its `DECODERS` entry,
+        sharing a single request and decoded result between concurrent callers
+        of the same query; callers must not modify it.
+        """
+        key = (server, query)
+        request = self.in_flight.get(key)
+        if request is None:
+            request = asyncio.ensure_future(self._get_rcon(server, query))
+            self.in_flight[key] = request
+
+            def done(request):
+                if self.in_flight.get(key) is request:
+                    del self.in_flight[key]
+                # Callers may all be gone, don't warn about an unretrieved exception
+                if not request.cancelled():
+                    request.exception()
+
+            request.add_done_callback(done)
+        # A caller being cancelled mustn't cancel the request for the others
+        return await asyncio.shield(request)
+
+    async def _get_rcon(self, server, query):
+        result = await self.request_rcon("GET", server, query)
+        decoder = DECODERS.get(query)
+        if decoder is None:
+            return result
+        if len(result) > LARGE_RESULT_ENTRIES:
+            return await run_blocking(decoder, result)
+        return decoder(result)
 
     async def post_rcon(self, server, query, json):
         return await self.request_rcon("POST", server, query, json)
 
-    @for_each_rcon
+    @for_single_rcon
     async def grant_vip(self, rcon_server_url, name, player_id, expiration):
         """
-        Add a new VIP entry to the RCON instances or update an existing entry.
+        Add a new VIP entry to the RCON instance or update an existing entry.
 
         Must supply the RCON server arguments:
         name -- user's name in RCON
         player_id -- user's `Player ID`
         expiration -- time VIP expires
 
-        Returns True for success, False for failure.
+        Raises on failure.
         """
-        try:
-            await self.post_rcon(
-                rcon_server_url,
-                "add_vip",
-                {
-                    "description": name,
-                    "player_id": str(player_id),
-                    "expiration": expiration.isoformat(timespec="seconds"),
-                },
-            )
-        except Exception:
-            self.logger.exception(f'Failed to update VIP user on "{rcon_server_url}"')
-            return False
+        await self.post_rcon(
+            rcon_server_url,
+            "add_vip",
+            {
+                "description": name,
+                "player_id": str(player_id),
+                "expiration": expiration.isoformat(timespec="seconds"),
+            },
+        )
         self.logger.debug(
-            f'Granted VIP to user "{name}/{player_id}", expiration {expiration}'
+            'Granted VIP to user "%s/%s", expiration %s on "%s"',
+            name,
+            player_id,
+            expiration,
+            rcon_server_url,
         )
-        return True
 
     # @for_each_rcon
     # async def revoke_vip(self, rcon_server_url, client, name, player_id):
@@ -155,23 +285,22 @@ class HLL_RCON_Client:
     @for_each_rcon
     async def get_vip(self, rcon_server_url, player_id):
         """
-        Queries the RCON server for all VIP's, and returns a single VIP object
-        based on the input player_id.
-        """
-        vip_list = await self.get_rcon(rcon_server_url, "get_vip_ids")
-        for vip in vip_list:
-            # Work around for https://github.com/MarechJ/hll_rcon_tool/issues/248
-            # We need to verify numerical input
-            try:
-                if vip["player_id"] == player_id:
-                    if vip["name"].startswith("Temp VIP"):
-                        return None
-                    return vip["vip_expiration"]
-            except ValueError as e:
-                self.logger.error(f"Improper Player ID for VIP entry from RCON: {e}")
-                self.logger.error(f"Failed entry: {vip}")
-                continue
-        return None
+        Queries the RCON servers for all VIP's, and returns the VIP expiration
+        of the input player_id.
+        """
+        return await self.get_server_vip(rcon_server_url, player_id)
+
+    @for_single_rcon
+    async def get_server_vip(self, rcon_server_url, player_id):
+        """
+        Queries the RCON server for all VIP's, and returns the VIP expiration
+        of the input player_id.
+        """
+        vips = await self.get_rcon(rcon_server_url, "get_vip_ids")
+        vip = vips.get(player_id)
+        if vip is None or vip.name.startswith("Temp VIP"):
+            return None
+        return vip.vip_expiration
 
     @for_single_rcon
     async def get_player_list(self, rcon_server_url):
@@ -184,6 +313,30 @@ class HLL_RCON_Client:
             self.logger.exception(f"get_players failed for {rcon_server_url}")
         return []
 
+    @for_single_rcon
+    async def get_player_count(self, rcon_server_url):
+        """
+        Queries the RCON server(s) for the number of players, from the slots as a
+        "current/max" string or a dict of `current_players`.  Returns None on failure.
+        """
+        try:
+            slots = await self.get_rcon(rcon_server_url, "get_slots")
+            if isinstance(slots, dict):
+                count = int(slots["current_players"])
+            else:
+                count = int(str(slots).split("/")[0])
+        except Exception as e:
+            if rcon_server_url not in self.slots_failing:
+                self.slots_failing.add(rcon_server_url)
+                self.logger.warning(
+                    f"get_slots failed for {rcon_server_url}, counting players with get_players until it works: {e!r}"
+                )
+            return None
+        if rcon_server_url in self.slots_failing:
+            self.slots_failing.discard(rcon_server_url)
+            self.logger.info(f"get_slots works again for {rcon_server_url}")
+        return count
+
     @for_single_rcon
     async def send_player_message(self, rcon_server_url, player_id, message):
         """
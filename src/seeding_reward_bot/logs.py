@@ -0,0 +1,72 @@
+import atexit
+import logging
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+from seeding_reward_bot.config import global_config
+
+LOG_FORMAT = "%(levelname)s:%(name)s:%(message)s"
+
+
+class ErrorRateLimitFilter(logging.Filter):
+    """
+    Drops error records repeating one logged from the same place within the
+    last `period` seconds, noting how many were dropped on the next one let through.
+    """
+
+    def __init__(self, period: float):
+        super().__init__()
+        self.period = period
+        # (last emitted, suppressed since) by record key
+        self.seen: dict[tuple, tuple[float, int]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.ERROR or not self.period:
+            return True
+
+        now = time.monotonic()
+        key = (record.name, record.pathname, record.lineno, str(record.msg))
+        last, suppressed = self.seen.get(key, (0.0, 0))
+        if now - last < self.period:
+            self.seen[key] = (last, suppressed + 1)
+            return False
+
+        if suppressed:
+            record.msg = f"{record.msg} ({suppressed} similar records suppressed)"
+        self.seen[key] = (now, 0)
+        if len(self.seen) > 1000:
+            self.seen = {
+                key: seen
+                for key, seen in self.seen.items()
+                if now - seen[0] < self.period
+            }
+        return True
+
+
+def setup_logging() -> QueueListener:
+    """
+    Send all log records through a queue to a handler on a background thread,
+    so writing them doesn't block the event loop, with `LOG_LEVEL` as the root
+    level, `LOG_LEVELS` per logger, and repeated errors rate limited by
+    `LOG_ERROR_RATE_LIMIT_SECONDS`.
+    """
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    records = queue.SimpleQueue()
+    listener = QueueListener(records, handler)
+
+    # Renders each record (only those that passed the levels) before queueing
+    # it, so its arguments can't change before the listener thread formats it
+    queue_handler = QueueHandler(records)
+    queue_handler.addFilter(ErrorRateLimitFilter(global_config.log_error_rate_limit))
+    root = logging.getLogger()
+    root.handlers.clear()
+    root.addHandler(queue_handler)
+    root.setLevel(global_config.log_level)
+    for name, level in global_config.log_levels.items():
+        logging.getLogger(name).setLevel(level)
+
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -4,7 +4,10 @@ import discord
 
 from seeding_reward_bot import db
 from seeding_reward_bot.config import global_config
+from seeding_reward_bot.eventloop import loop_monitor
+from seeding_reward_bot.health import health
 from seeding_reward_bot.hll_rcon_client import HLL_RCON_Client
+from seeding_reward_bot.logs import setup_logging
 
 
 class HLLDiscordBot(discord.Bot):
@@ -17,31 +20,53 @@ class HLLDiscordBot(discord.Bot):
         await self.client.close()
 
 
+def member_cache_flags(flags: list[str]) -> discord.MemberCacheFlags:
+    """Member cache flags with only `flags` set, since unset ones default to on."""
+    cache_flags = discord.MemberCacheFlags.none()
+    for flag in flags:
+        setattr(cache_flags, flag, True)
+    return cache_flags
+
+
 def run_discord_bot():
     """
     Entry point for discord bot.
     """
-    # Set logging level
-    logging.basicConfig(level=global_config.log_level)
+    # Set up logging levels and the background log writer
+    setup_logging()
 
     logger = logging.getLogger(__package__)
 
-    # Create a hll discord bot (has an RCON client)
-    bot = HLLDiscordBot()
+    # Create a hll discord bot (has an RCON client), subscribed and caching only
+    # what the slash commands need
+    bot = HLLDiscordBot(
+        intents=discord.Intents(
+            **{intent: True for intent in global_config.discord_intents}
+        ),
+        max_messages=global_config.discord_message_cache_size or None,
+        member_cache_flags=member_cache_flags(global_config.discord_member_cache),
+        chunk_guilds_at_startup=False,
+    )
 
     # Load the bot extension
     bot.load_extension("seeding_reward_bot.commands.hll")
     bot.load_extension("seeding_reward_bot.commands.hll_admin")
-    bot.load_extension("seeding_reward_bot.tasks")
-
-    # Disable Discord verbose logging - it's spammy
-    logging.getLogger("discord").setLevel(logging.WARNING)
+    bot.load_extension("seeding_reward_bot.vip_grants")
+    if global_config.seeding_poller_in_bot:
+        bot.load_extension("seeding_reward_bot.tasks")
+    else:
+        logger.info("Seeding poller disabled, run `seedbot-poller` separately")
 
     # Actually run the bot.
     logger.info("Starting discord services...")
 
     # Initialize database
     bot.loop.create_task(db.init())
+    # Watch for event loop stalls
+    bot.loop.create_task(loop_monitor.run())
+    # Serve the health endpoint, if enabled
+    if global_config.health_port:
+        bot.loop.create_task(health.serve(bot.client, gateway=bot))
     try:
         bot.loop.run_until_complete(bot.start(global_config.discord_token))
     except KeyboardInterrupt:
@@ -0,0 +1,29 @@
+import statistics
+from collections.abc import Collection
+from dataclasses import dataclass
+
+# Phases of a seeding tick recorded in `TickTiming`
+TICK_PHASES = ("fetch", "credit", "sessions", "messages")
+
+
+def percentiles(values: Collection[float]) -> dict[str, float]:
+    """Returns the p50, p95 and p99 of `values`, 0 for each when empty."""
+    if len(values) < 2:
+        value = next(iter(values), 0.0)
+        return {"p50": value, "p95": value, "p99": value}
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return {"p50": cuts[49], "p95": cuts[94], "p99": cuts[98]}
+
+
+@dataclass
+class TickTiming:
+    """
+    Time (in seconds) spent in each phase of one server's seeding tick.
+    """
+
+    server: str
+    fetch: float = 0.0
+    credit: float = 0.0
+    sessions: float = 0.0
+    messages: float = 0.0
+    players: int = 0
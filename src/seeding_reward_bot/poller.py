@@ -0,0 +1,77 @@
+import asyncio
+import logging
+
+from seeding_reward_bot import db
+from seeding_reward_bot.config import global_config
+from seeding_reward_bot.eventloop import loop_monitor
+from seeding_reward_bot.health import health
+from seeding_reward_bot.hll_rcon_client import HLL_RCON_Client
+from seeding_reward_bot.logs import setup_logging
+from seeding_reward_bot.rcon_replay import RCON_Replay
+from seeding_reward_bot.tasks import SEEDING_INCREMENT_TIMER, BotTasks
+
+
+async def poll_seeders():
+    client = HLL_RCON_Client()
+    await db.init()
+    tasks = BotTasks(client)
+    monitor_task = asyncio.create_task(loop_monitor.run())
+    if global_config.health_port:
+        health_task = asyncio.create_task(health.serve(client))
+    try:
+        if client.replay is not None:
+            await replay_seeders(tasks, client.replay)
+        else:
+            # Runs until cancelled, or until the seeding loop dies from an error
+            await tasks.update_seeders.get_task()
+    finally:
+        tasks.update_seeders.cancel()
+        tasks.compact_sessions.cancel()
+        tasks.snapshot_ledger.cancel()
+        tasks.sample_player_counts.cancel()
+        tasks.downsample_counts.cancel()
+        monitor_task.cancel()
+        if global_config.health_port:
+            health_task.cancel()
+        await client.close()
+        await db.close()
+
+
+async def replay_seeders(tasks: BotTasks, replay: RCON_Replay):
+    """
+    Run the seeding tick `rcon_replay_speed` times faster until the RCON replay
+    runs out of recorded responses.
+    """
+    speed = global_config.rcon_replay_speed
+    interval = SEEDING_INCREMENT_TIMER * 60 / speed if speed else 0
+    tasks.update_seeders.change_interval(seconds=interval)
+    # Only the seeding tick is replayed, so the recorded responses all go to it
+    tasks.sample_player_counts.cancel()
+
+    exhausted = asyncio.create_task(replay.exhausted.wait())
+    await asyncio.wait(
+        (exhausted, tasks.update_seeders.get_task()),
+        return_when=asyncio.FIRST_COMPLETED,
+    )
+    exhausted.cancel()
+    logging.getLogger(__package__).info("RCON replay finished")
+
+
+def run_seeding_poller():
+    """
+    Entry point for the standalone seeding poller.
+
+    Runs the seeding tick and reward messages with its own RCON client, without
+    connecting to discord, so the discord bot can run with `SEEDING_POLLER_IN_BOT=false`.
+
+    With `RCON_REPLAY_FILE` set, replays the recorded RCON traffic and exits.
+    """
+    setup_logging()
+
+    logger = logging.getLogger(__package__)
+    logger.info("Starting seeding poller...")
+
+    try:
+        asyncio.run(poll_seeders())
+    except KeyboardInterrupt:
+        pass
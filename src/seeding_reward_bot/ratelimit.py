@@ -0,0 +1,105 @@
+import time
+
+from seeding_reward_bot.config import global_config
+
+# Per-user buckets kept per command before refilled ones are dropped
+MAX_USER_BUCKETS = 1000
+
+
+class TokenBucket:
+    """
+    Allows bursts of up to `capacity` calls, refilling at `capacity` per `period` seconds.
+    """
+
+    def __init__(self, capacity: int, period: float):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def retry_after(self, now: float) -> float:
+        """Seconds until a call is allowed, 0 if it is allowed now."""
+        self.refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    @property
+    def full(self) -> bool:
+        return self.tokens >= self.capacity
+
+
+class CommandRateLimit:
+    """
+    Per-user and global token buckets of a single command, configured by
+    `{"user": [calls, seconds], "global": [calls, seconds]}`, either optional.
+    """
+
+    def __init__(self, limits: dict):
+        self.user_limit = limits.get("user")
+        self.global_bucket = None
+        if limits.get("global"):
+            self.global_bucket = TokenBucket(*limits["global"])
+        self.user_buckets: dict[int, TokenBucket] = {}
+
+    def user_bucket(self, user_id: int, now: float) -> TokenBucket | None:
+        if not self.user_limit:
+            return None
+        bucket = self.user_buckets.get(user_id)
+        if bucket is None:
+            if len(self.user_buckets) >= MAX_USER_BUCKETS:
+                self.prune(now)
+            bucket = self.user_buckets[user_id] = TokenBucket(*self.user_limit)
+        return bucket
+
+    def prune(self, now: float) -> None:
+        for user_id, bucket in list(self.user_buckets.items()):
+            bucket.refill(now)
+            if bucket.full:
+                del self.user_buckets[user_id]
+
+    def acquire(self, user_id: int) -> tuple[float, bool]:
+        """
+        Take a call from the user's and the global bucket, only if both allow it.
+
+        Returns `(retry_after, is_global)`, `retry_after` being 0 when allowed.
+        """
+        now = time.monotonic()
+        user_bucket = self.user_bucket(user_id, now)
+        if user_bucket is not None:
+            retry_after = user_bucket.retry_after(now)
+            if retry_after:
+                return retry_after, False
+        if self.global_bucket is not None:
+            retry_after = self.global_bucket.retry_after(now)
+            if retry_after:
+                return retry_after, True
+            self.global_bucket.tokens -= 1
+        if user_bucket is not None:
+            user_bucket.tokens -= 1
+        return 0.0, False
+
+
+class RateLimiter:
+    """
+    Rate limits of slash commands by qualified name, see `RATE_LIMITS`.
+    """
+
+    def __init__(self, limits: dict[str, dict]):
+        self.commands = {
+            name: CommandRateLimit(command_limits)
+            for name, command_limits in limits.items()
+        }
+
+    def acquire(self, command_name: str, user_id: int) -> tuple[float, bool]:
+        command = self.commands.get(command_name)
+        if command is None:
+            return 0.0, False
+        return command.acquire(user_id)
+
+
+rate_limiter = RateLimiter(global_config.rate_limits)
@@ -0,0 +1,95 @@
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+def loads(content: bytes) -> Any:
+    """Decode an RCON response body, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+@dataclass(slots=True, frozen=True)
+class RCON_Player:
+    """
+    Player entry of `get_players`.
+    """
+
+    name: str
+    player_id: str
+
+
+@dataclass(slots=True, frozen=True)
+class RCON_VIP:
+    """
+    VIP entry of `get_vip_ids`, `vip_expiration` is an ISO 8601 datetime or None.
+    """
+
+    name: str
+    player_id: str
+    vip_expiration: str | None
+
+
+def _player_id(entry: Any) -> str:
+    # Work around for https://github.com/MarechJ/hll_rcon_tool/issues/248
+    # We need to verify the Player ID is a non-empty string
+    player_id = entry["player_id"]
+    if not isinstance(player_id, str) or not player_id:
+        raise ValueError(f"Improper Player ID {player_id!r}")
+    return player_id
+
+
+def decode_players(result: Any) -> list[RCON_Player]:
+    """
+    Decode a `get_players` result into `RCON_Player` records, dropping (and
+    logging) malformed entries.
+    """
+    players = []
+    for entry in result:
+        try:
+            name = entry["name"]
+            if not isinstance(name, str):
+                raise ValueError(f"Improper name {name!r}")
+            players.append(RCON_Player(name, _player_id(entry)))
+        except (TypeError, KeyError, ValueError) as e:
+            logger.error(f"Rejected player entry from RCON ({e!r}): {entry}")
+    return players
+
+
+def decode_vips(result: Any) -> dict[str, RCON_VIP]:
+    """
+    Decode a `get_vip_ids` result into `RCON_VIP` records by Player ID, keeping
+    the first entry of each player and dropping (and logging) malformed entries.
+    """
+    vips = {}
+    for entry in result:
+        try:
+            name = entry["name"]
+            if not isinstance(name, str):
+                raise ValueError(f"Improper name {name!r}")
+            expiration = entry["vip_expiration"]
+            if expiration is not None:
+                datetime.fromisoformat(expiration)
+            vip = RCON_VIP(name, _player_id(entry), expiration)
+        except (TypeError, KeyError, ValueError) as e:
+            logger.error(f"Rejected VIP entry from RCON ({e!r}): {entry}")
+            continue
+        vips.setdefault(vip.player_id, vip)
+    return vips
+
+
+# Decoders of the GET queries returning records, see `HLL_RCON_Client.get_rcon`
+DECODERS = {
+    "get_players": decode_players,
+    "get_vip_ids": decode_vips,
+}
@@ -0,0 +1,131 @@
+import asyncio
+import gzip
+import json
+import logging
+import queue
+import threading
+import zlib
+from collections import deque
+from typing import Any
+
+
+class RCON_Replay_Error(Exception):
+    pass
+
+
+class RCON_Recorder:
+    """
+    Appends every RCON request and its result or error, with its start time
+    and duration, as a gzipped JSON line to `path`.
+
+    Each line is its own gzip member written out right away, so a recording
+    cut short by a crash only loses the lines not written yet.  Encoding and
+    writing happen on a background thread, the responses recorded must not be
+    changed afterwards.
+    """
+
+    def __init__(self, path: str):
+        self.logger = logging.getLogger(__name__)
+        self.file = open(path, "ab")
+        self.entries: queue.SimpleQueue[dict | None] = queue.SimpleQueue()
+        self.writer = threading.Thread(
+            target=self.write, name="seedbot-rcon-recorder", daemon=True
+        )
+        self.writer.start()
+        self.logger.info(f'Recording RCON traffic to "{path}"')
+
+    def record(
+        self,
+        start: float,
+        duration: float,
+        method: str,
+        server: str,
+        query: str,
+        body: Any = None,
+        *,
+        result: Any = None,
+        error: BaseException | None = None,
+    ) -> None:
+        entry = {
+            "t": round(start, 3),
+            "d": round(duration, 3),
+            "m": method,
+            "s": server,
+            "q": query,
+        }
+        if body is not None:
+            entry["b"] = body
+        if error is not None:
+            entry["e"] = repr(error)
+        else:
+            entry["r"] = result
+        self.entries.put(entry)
+
+    def write(self) -> None:
+        while (entry := self.entries.get()) is not None:
+            try:
+                line = json.dumps(entry, separators=(",", ":"), default=str) + "\n"
+                self.file.write(gzip.compress(line.encode("utf-8")))
+                self.file.flush()
+            except Exception:
+                self.logger.exception(f'Failed recording RCON request "{entry["q"]}"')
+
+    def close(self) -> None:
+        self.entries.put(None)
+        self.writer.join()
+        self.file.close()
+
+
+class RCON_Replay:
+    """
+    Answers RCON requests from a recording made by `RCON_Recorder`, without
+    any network.
+
+    Requests are answered in recorded order per (method, server, query), each
+    after its recorded duration divided by `speed` (0 answers immediately).
+    Once the recording of a query runs out its last response is repeated, and
+    `exhausted` is set.  POSTs without a recording succeed.
+    """
+
+    def __init__(self, path: str, speed: float):
+        self.logger = logging.getLogger(__name__)
+        self.speed = speed
+        self.exhausted = asyncio.Event()
+        self.entries: dict[tuple[str, str, str], deque[dict]] = {}
+        self.last: dict[tuple[str, str, str], dict] = {}
+
+        count = 0
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as file:
+                for line in file:
+                    entry = json.loads(line)
+                    key = (entry["m"], entry["s"], entry["q"])
+                    self.entries.setdefault(key, deque()).append(entry)
+                    count += 1
+        except (EOFError, gzip.BadGzipFile, zlib.error, ValueError) as e:
+            # The recording was cut short, e.g. the recording process was killed
+            self.logger.warning(
+                f'Recording "{path}" is truncated after {count} RCON requests: {e!r}'
+            )
+        self.logger.info(f'Replaying {count} RCON requests from "{path}"')
+
+    async def request(self, method: str, server: str, query: str) -> Any:
+        key = (method, server, query)
+        queue = self.entries.get(key)
+        if queue:
+            entry = self.last[key] = queue.popleft()
+        elif key in self.last:
+            self.exhausted.set()
+            entry = self.last[key]
+        elif method == "POST":
+            return True
+        else:
+            raise RCON_Replay_Error(
+                f'No recorded RCON response for "{query}" on "{server}"'
+            )
+
+        if self.speed:
+            await asyncio.sleep(entry["d"] / self.speed)
+        if "e" in entry:
+            raise RCON_Replay_Error(f"Recorded RCON error: {entry['e']}")
+        return entry["r"]
@@ -1,50 +1,103 @@
 import asyncio
 import logging
+import time
+import zoneinfo
+from collections import deque
 from datetime import datetime, timedelta, timezone
 
 from discord.ext import commands, tasks
+from tortoise import connections
 from tortoise.exceptions import DoesNotExist
 from tortoise.transactions import atomic
 
+from seeding_reward_bot import db
 from seeding_reward_bot.config import global_config
-from seeding_reward_bot.db import HLL_Player, Seeding_Session
+from seeding_reward_bot.db import (
+    HLL_Player,
+    LedgerKind,
+    Open_Seeding_Session,
+    Seeding_Ledger,
+    Seeding_Session,
+    Server_Player_Count,
+    apply_ledger,
+    compact_seeding_sessions,
+    downsample_player_counts,
+    record_seeding_stats,
+    snapshot_balances,
+)
+from seeding_reward_bot.db_backend import query_timeout
+from seeding_reward_bot.health import health
+from seeding_reward_bot.hll_rcon_client import HLL_RCON_Client
 from seeding_reward_bot.main import HLLDiscordBot
+from seeding_reward_bot.perf import TickTiming
+from seeding_reward_bot.rcon_records import RCON_Player
 
 # Minutes - how often the RCON is queried for seeding checks
 SEEDING_INCREMENT_TIMER = 3
 
+# Number of per-server tick timings kept for `/hll-admin perf`
+TICK_TIMING_HISTORY = 200
+
+# Hours - how often old seeding sessions are compacted into daily totals
+COMPACTION_TIMER = 6
+
+# Minutes - how often seeding ledger entries are folded into balance snapshots
+LEDGER_SNAPSHOT_TIMER = 15
+
+# Minutes - how often every server's player count is recorded, all day
+PLAYER_COUNT_TIMER = 3
+
+# Hours - how often server player counts are downsampled
+DOWNSAMPLE_TIMER = 1
+
+# Days - server player counts are kept per tick for this long, then per 15 minutes
+PLAYER_COUNT_RAW_DAYS = 7
+
+# Days - 15 minute server player counts are kept this long, then hourly
+PLAYER_COUNT_15M_DAYS = 90
+
+# Days - hourly server player counts are kept this long, then deleted
+PLAYER_COUNT_HOURLY_DAYS = 2 * 365
+
 
 class BotTasks(commands.Cog):
     """
     Cog to handle bot tasks/scheduling.
     """
 
-    def __init__(self, bot: HLLDiscordBot):
-        self.bot = bot
-        self.client = bot.client
+    def __init__(self, client: HLL_RCON_Client):
+        self.client = client
         self.logger = logging.getLogger(__name__)
 
         self.reward_time = timedelta(minutes=SEEDING_INCREMENT_TIMER)
 
+        # Seeding session start and last time seen of current seeders, per server
         self.seeders = {
             rcon_server_url: {} for rcon_server_url in global_config.rcon_url
         }
+        self.last_seen = {
+            rcon_server_url: {} for rcon_server_url in global_config.rcon_url
+        }
+        self.tick_timings: deque[TickTiming] = deque(maxlen=TICK_TIMING_HISTORY)
 
         # Start tasks during init
+        health.watch_ticks(global_config.rcon_url, SEEDING_INCREMENT_TIMER * 60)
         self.update_seeders.start()
+        self.snapshot_ledger.start()
+        self.sample_player_counts.start()
+        self.downsample_counts.start()
+        if global_config.seeding_session_retention_months:
+            self.compact_sessions.start()
 
     @tasks.loop(minutes=SEEDING_INCREMENT_TIMER)
     async def update_seeders(self):
         """
         Check if a server is in seeding status and record seeding statistics.
-        If RCON reports `seeding_threshold` is not met, server qualifies as "seeding".
+        If RCON reports its community's `seeding_threshold` is not met, server qualifies as "seeding".
         Accumulate total "seeding" time for users including "unspent" seeding time to be used
         for rewards to those who seed.
         """
-        # Ensure that we are during active seeding hours, if set.
-        seeding_start_time = global_config.seeding_start_time_utc
-        seeding_end_time = global_config.seeding_end_time_utc
-
+        # Ensure that we are during active seeding hours of each community, if set.
         time_now = datetime.now(timezone.utc).time()
 
         # https://stackoverflow.com/questions/20518122/python-working-out-if-time-now-is-between-two-times
@@ -56,71 +109,234 @@ class BotTasks(commands.Cog):
             else:
                 return start <= now or now < end
 
-        if not is_now(seeding_start_time, seeding_end_time, time_now):
+        rcon_server_urls = []
+        for community in global_config.communities:
+            seeding_start_time = community.seeding_start_time_utc
+            seeding_end_time = community.seeding_end_time_utc
+            if is_now(seeding_start_time, seeding_end_time, time_now):
+                rcon_server_urls.extend(community.rcon_url)
+                continue
             self.logger.debug(
-                f'Not within seeding time range of "{seeding_start_time} - {seeding_end_time}" UTC'
+                'Not within seeding time range of "%s - %s" UTC for community "%s"',
+                seeding_start_time,
+                seeding_end_time,
+                community.name,
             )
+            for rcon_server_url in community.rcon_url:
+                health.tick(rcon_server_url)
+        if not rcon_server_urls:
             return
 
-        # Run once per RCON:
-        async with asyncio.TaskGroup() as tg:
-            for rcon_server_url in global_config.rcon_url:
-                tg.create_task(self.update_seeders_per_server(tg, rcon_server_url))
+        # Run once per RCON, with tighter query timeouts than the command paths
+        # so a slow query can't hold a connection for the rest of the tick.
+        timings = [TickTiming(rcon_server_url) for rcon_server_url in rcon_server_urls]
+        with query_timeout(global_config.db_tick_query_timeout):
+            async with asyncio.TaskGroup() as tg:
+                for timing in timings:
+                    tg.create_task(self.update_seeders_per_server(tg, timing))
+        # Only recorded once the reward messages sent during the tick are done
+        self.tick_timings.extend(timings)
 
     async def update_seeders_per_server(
-        self, tg: asyncio.TaskGroup, rcon_server_url: str
+        self, tg: asyncio.TaskGroup, timing: TickTiming
     ):
-        player_list = await self.client.get_player_list(rcon_server_url)
+        rcon_server_url = timing.server
+        community = global_config.server_community(rcon_server_url)
 
-        self.logger.debug(f'Processing seeding player list for "{rcon_server_url}"...')
+        # Only fetch the full player list when the server could be seeding, a
+        # full server is ruled out by its (much cheaper) player count
+        start = time.perf_counter()
+        slots_count = player_count = await self.client.get_player_count(rcon_server_url)
+        player_list = None
+        if (
+            player_count is None
+            or player_count
+            < community.seeding_threshold + community.seeding_precheck_margin
+        ):
+            player_list = await self.client.get_player_list(rcon_server_url)
+            # An empty player list may just be a failed request
+            if player_list or slots_count is None:
+                player_count = len(player_list)
+        timing.fetch = time.perf_counter() - start
+        timing.players = player_count
+
+        self.logger.debug('Processing seeding player list for "%s"...', rcon_server_url)
 
         # Check if player count is below seeding threshold
-        if len(player_list) < global_config.seeding_threshold:
+        if player_list is not None and player_count < community.seeding_threshold:
             self.logger.info(
                 f'Server "{rcon_server_url}" qualifies for seeding status at this time.'
             )
             self.logger.debug(
-                f'Returned player list for "{rcon_server_url}" is "{player_list}"'
+                'Returned player list for "%s" is "%s"', rcon_server_url, player_list
             )
 
             # Iterate through current players and accumulate their seeding time
             for player in player_list:
-                await self.update_seeders_per_player(tg, rcon_server_url, player)
-            self.seeders[rcon_server_url] = {
-                player["player_id"]: self.seeders[rcon_server_url].get(
-                    player["player_id"], datetime.now(timezone.utc)
-                )
-                for player in player_list
-            }
-            self.logger.debug(f'Seeder status updated for server "{rcon_server_url}"')
+                start = time.perf_counter()
+                sessions = timing.sessions
+                await self.update_seeders_per_player(tg, timing, player)
+                # Session bookkeeping is timed on its own, the rest is crediting
+                elapsed = time.perf_counter() - start
+                timing.credit += elapsed - (timing.sessions - sessions)
+            self.track_seeders(
+                rcon_server_url, {player.player_id for player in player_list}
+            )
+            self.logger.debug('Seeder status updated for server "%s"', rcon_server_url)
         else:
-            self.seeders[rcon_server_url] = {}
+            self.track_seeders(rcon_server_url, set())
             self.logger.debug(
-                f"Server {rcon_server_url} does not qualify as seeding status at this time (player_count = {len(player_list)}, must be > {global_config.seeding_threshold}).  Skipping."
+                "Server %s does not qualify as seeding status at this time (player_count = %s, must be > %s).  Skipping.",
+                rcon_server_url,
+                player_count,
+                community.seeding_threshold,
+            )
+        await self.save_seeders(rcon_server_url)
+        health.tick(rcon_server_url)
+
+    @tasks.loop(minutes=PLAYER_COUNT_TIMER)
+    async def sample_player_counts(self):
+        """
+        Record the player count of every server, also outside the seeding
+        hours, for `/hll-admin time_to_seed`.
+        """
+        await asyncio.gather(
+            *(
+                self.sample_player_count(rcon_server_url)
+                for rcon_server_url in global_config.rcon_url
+            )
+        )
+
+    @sample_player_counts.before_loop
+    async def before_sample_player_counts(self):
+        await db.initialized.wait()
+
+    async def sample_player_count(self, rcon_server_url: str):
+        player_count = await self.client.get_player_count(rcon_server_url)
+        if player_count is None:
+            player_list = await self.client.get_player_list(rcon_server_url)
+            # An empty player list may just be a failed request
+            if not player_list:
+                return
+            player_count = len(player_list)
+        await self.record_player_count(rcon_server_url, player_count)
+
+    async def record_player_count(self, rcon_server_url: str, player_count: int):
+        try:
+            await Server_Player_Count.create(
+                server=global_config.rcon_url[rcon_server_url],
+                time=datetime.now(timezone.utc),
+                players_min=player_count,
+                players_max=player_count,
+                players_sum=player_count,
             )
+        except Exception:
+            self.logger.exception(
+                f'Failed recording the player count of "{rcon_server_url}"'
+            )
+
+    @update_seeders.before_loop
+    async def restore_seeders(self):
+        """
+        Restore the seeding sessions that were open when the seeding poller
+        stopped, if it was back within `seeding_session_grace_minutes`.
+        """
+        await db.initialized.wait()
+
+        servers = {server: url for url, server in global_config.rcon_url.items()}
+        grace = timedelta(minutes=global_config.seeding_session_grace_minutes)
+        try:
+            open_sessions = await Open_Seeding_Session.filter(
+                server__in=list(servers),
+                last_seen__gte=datetime.now(timezone.utc) - grace,
+            )
+        except Exception:
+            self.logger.exception("Failed restoring open seeding sessions")
+            return
+
+        for session in open_sessions:
+            rcon_server_url = servers[session.server]
+            self.seeders[rcon_server_url][session.player_id] = session.start_time
+            self.last_seen[rcon_server_url][session.player_id] = session.last_seen
+        self.logger.info(f"Restored {len(open_sessions)} open seeding sessions")
+
+    @atomic()
+    async def save_seeders(self, rcon_server_url: str):
+        """
+        Save the open seeding sessions of `rcon_server_url` for `restore_seeders`.
+        """
+        server = global_config.rcon_url[rcon_server_url]
+        seeders = self.seeders[rcon_server_url]
+        last_seen = self.last_seen[rcon_server_url]
+        try:
+            await (
+                Open_Seeding_Session.filter(server=server)
+                .exclude(player_id__in=list(seeders))
+                .delete()
+            )
+            if seeders:
+                await Open_Seeding_Session.bulk_create(
+                    [
+                        Open_Seeding_Session(
+                            server=server,
+                            player_id=player_id,
+                            start_time=start_time,
+                            last_seen=last_seen[player_id],
+                        )
+                        for player_id, start_time in seeders.items()
+                    ],
+                    on_conflict=("server", "player_id"),
+                    update_fields=("start_time", "last_seen"),
+                )
+        except Exception:
+            self.logger.exception(
+                f'Failed saving open seeding sessions for "{rcon_server_url}"'
+            )
+
+    def track_seeders(self, rcon_server_url: str, player_ids: set[str]) -> None:
+        """
+        Track the seeding session start of the seeders in `player_ids`.
+
+        Seeders missing for up to `seeding_session_grace_minutes` keep their
+        session, so a map change, reconnect or failed RCON call doesn't split it.
+        """
+        now = datetime.now(timezone.utc)
+        grace = timedelta(minutes=global_config.seeding_session_grace_minutes)
+        seeders = self.seeders[rcon_server_url]
+        last_seen = self.last_seen[rcon_server_url]
+
+        for player_id in player_ids:
+            seeders.setdefault(player_id, now)
+            last_seen[player_id] = now
+
+        for player_id, seen in list(last_seen.items()):
+            if now - seen > grace:
+                del seeders[player_id]
+                del last_seen[player_id]
 
     @atomic()
     async def update_seeders_per_player(
-        self, tg: asyncio.TaskGroup, rcon_server_url: str, player: dict
+        self, tg: asyncio.TaskGroup, timing: TickTiming, player: RCON_Player
     ):
-        player_name = player["name"]
-        player_id = player["player_id"]
+        rcon_server_url = timing.server
+        player_name = player.name
+        player_id = player.player_id
         self.logger.debug(
-            f'Processing seeding record for player "{player_name}/{player_id}"'
+            'Processing seeding record for player "%s/%s"', player_name, player_id
         )
         try:
-            seeder = await HLL_Player.select_for_update().get(player_id=player_id)
+            seeder = await HLL_Player.get(player_id=player_id)
         except DoesNotExist:
             # New seeder, make a record
             self.logger.debug(
-                f'Generating new seeder record for "{player_name}/{player_id}"'
+                'Generating new seeder record for "%s/%s"', player_name, player_id
             )
             try:
                 seeder = await HLL_Player.create(
                     player_id=player_id,
                     player_name=player_name,
-                    seeding_time_balance=self.reward_time,
-                    total_seeding_time=self.reward_time,
+                    seeding_time_balance=timedelta(),
+                    total_seeding_time=timedelta(),
                     last_seed_check=datetime.now(timezone.utc),
                 )
             except Exception:
@@ -131,51 +347,56 @@ class BotTasks(commands.Cog):
         except Exception:
             self.logger.exception(f"Failed getting record for {player_id=}")
             return
-        else:
-            old_seed_balance = seeder.seeding_time_balance
-            seeder.player_name = player_name
-            seeder.seeding_time_balance += self.reward_time
-            seeder.total_seeding_time += self.reward_time
-            seeder.last_seed_check = datetime.now(timezone.utc)
 
-            try:
-                self.logger.debug(
-                    f'Updating record for "{seeder.player_name}/{seeder.player_id}" to new total "{seeder.total_seeding_time}" (new seeding balance "{seeder.seeding_time_balance}")'
-                )
-                await seeder.save(
-                    update_fields=[
-                        "player_name",
-                        "seeding_time_balance",
-                        "total_seeding_time",
-                        "last_seed_check",
-                    ]
-                )
-                self.logger.debug(
-                    f'Successfully updated seeding record for "{seeder.player_name}"'
-                )
-            except Exception:
-                self.logger.exception(
-                    f'Failed updating record "{player_name}" ({player_id}) during seeding'
-                )
-                return
+        # Credits are appended to the ledger, so the tick doesn't lock or
+        # rewrite the player row unless their name changed
+        try:
+            if seeder.player_name != player_name:
+                seeder.player_name = player_name
+                await seeder.save(update_fields=["player_name"])
+            await Seeding_Ledger.create(
+                hll_player=seeder, kind=LedgerKind.SEEDING, amount=self.reward_time
+            )
+            await record_seeding_stats(
+                seeder.pk,
+                global_config.rcon_url[rcon_server_url],
+                datetime.now(timezone.utc),
+                self.reward_time,
+            )
+            await apply_ledger([seeder], connections.get("default"))
+            self.logger.debug(
+                'Credited "%s/%s" to new total "%s" (new seeding balance "%s")',
+                seeder.player_name,
+                seeder.player_id,
+                seeder.total_seeding_time,
+                seeder.seeding_time_balance,
+            )
+        except Exception:
+            self.logger.exception(
+                f'Failed crediting "{player_name}" ({player_id}) during seeding'
+            )
+            return
 
-            # Check if user has gained an hour of seeding awards.
-            new_hourly = seeder.seeding_time_balance // timedelta(hours=1)
-            old_hourly = old_seed_balance // timedelta(hours=1)
+        # Check if user has gained an hour of seeding awards.
+        new_hourly = seeder.seeding_time_balance // timedelta(hours=1)
+        old_hourly = (seeder.seeding_time_balance - self.reward_time) // timedelta(
+            hours=1
+        )
 
-            if new_hourly > old_hourly:
-                self.logger.debug(
-                    f'Player "{seeder.player_name}/{seeder.player_id}" has gained 1 hour seeder rewards'
-                )
-                tg.create_task(
-                    self.send_seeding_message(rcon_server_url, seeder.player_id)
-                )
+        if new_hourly > old_hourly:
+            self.logger.debug(
+                'Player "%s/%s" has gained 1 hour seeder rewards',
+                seeder.player_name,
+                seeder.player_id,
+            )
+            tg.create_task(self.send_seeding_message(timing, seeder.player_id))
 
         start_time = self.seeders[rcon_server_url].get(player_id)
         if not start_time:
             return
         end_time = datetime.now(timezone.utc)
 
+        start = time.perf_counter()
         try:
             await Seeding_Session.update_or_create(
                 hll_player=seeder,
@@ -188,23 +409,117 @@ class BotTasks(commands.Cog):
                 f'Failed to update or create seeding session for "{player_name}" ({player_id})'
             )
             return
+        finally:
+            timing.sessions += time.perf_counter() - start
 
-    async def send_seeding_message(self, rcon_server_url: str, player_id: str):
-        if not await self.client.send_player_message(
-            rcon_server_url,
+    async def send_seeding_message(self, timing: TickTiming, player_id: str):
+        start = time.perf_counter()
+        sent = await self.client.send_player_message(
+            timing.server,
             player_id,
-            global_config.seeder_reward_message,
-        ):
+            global_config.server_community(timing.server).seeder_reward_message,
+        )
+        timing.messages += time.perf_counter() - start
+        if not sent:
             self.logger.error(
                 f'Failed to send seeder reward message to player "{player_id}"'
             )
 
+    @tasks.loop(hours=COMPACTION_TIMER)
+    async def compact_sessions(self):
+        """
+        Compact seeding sessions from before the start of the month
+        `seeding_session_retention_months` ago into daily totals per player and
+        server, in batches so no long locks are held on `seeding_session`.
+        """
+        # Whole days in the timezone the sessions are compacted by
+        tz = zoneinfo.ZoneInfo(global_config.leaderboard_default_timezone)
+        now = datetime.now(tz)
+        months = (
+            now.year * 12
+            + now.month
+            - 1
+            - global_config.seeding_session_retention_months
+        )
+        cutoff = datetime(months // 12, months % 12 + 1, 1, tzinfo=tz)
+        batch_size = global_config.seeding_session_compaction_batch_size
+
+        total = 0
+        try:
+            while True:
+                compacted = await compact_seeding_sessions(cutoff, batch_size)
+                total += compacted
+                if compacted < batch_size:
+                    break
+                # Let the seeding tick get its row locks in between batches
+                await asyncio.sleep(1)
+        except Exception:
+            self.logger.exception("Failed compacting seeding sessions")
+        if total:
+            self.logger.info(
+                f"Compacted {total} seeding sessions from before {cutoff} into daily totals"
+            )
+
+    @compact_sessions.before_loop
+    async def before_compact_sessions(self):
+        await db.initialized.wait()
+
+    @tasks.loop(hours=DOWNSAMPLE_TIMER)
+    async def downsample_counts(self):
+        """
+        Downsample the server player counts older than `PLAYER_COUNT_RAW_DAYS`
+        to 15 minute buckets, and those older than `PLAYER_COUNT_15M_DAYS` to
+        hourly buckets, deleting those older than `PLAYER_COUNT_HOURLY_DAYS`.
+        """
+        now = datetime.now(timezone.utc)
+        try:
+            raw = await downsample_player_counts(
+                0, 15 * 60, now - timedelta(days=PLAYER_COUNT_RAW_DAYS)
+            )
+            quarters = await downsample_player_counts(
+                15 * 60, 60 * 60, now - timedelta(days=PLAYER_COUNT_15M_DAYS)
+            )
+            expired = await Server_Player_Count.filter(
+                resolution=60 * 60,
+                time__lt=now - timedelta(days=PLAYER_COUNT_HOURLY_DAYS),
+            ).delete()
+        except Exception:
+            self.logger.exception("Failed downsampling server player counts")
+            return
+        self.logger.debug(
+            "Downsampled %s raw and %s 15 minute server player counts, deleted %s hourly ones",
+            raw,
+            quarters,
+            expired,
+        )
+
+    @downsample_counts.before_loop
+    async def before_downsample_counts(self):
+        await db.initialized.wait()
+
+    @tasks.loop(minutes=LEDGER_SNAPSHOT_TIMER)
+    async def snapshot_ledger(self):
+        """
+        Fold seeding ledger entries into the balance snapshots on `hll_player`,
+        keeping the ledger entries left to sum when reading a balance short.
+        """
+        try:
+            updated = await snapshot_balances()
+        except Exception:
+            self.logger.exception("Failed snapshotting seeding balances")
+            return
+        self.logger.debug("Snapshotted seeding balances of %s players", updated)
+
+    @snapshot_ledger.before_loop
+    async def before_snapshot_ledger(self):
+        await db.initialized.wait()
+
     def cog_unload(self):
         pass
 
 
 def setup(bot: HLLDiscordBot):
-    bot.add_cog(BotTasks(bot))
+    bot.add_cog(BotTasks(bot.client))
 
 
 def teardown(bot: HLLDiscordBot):
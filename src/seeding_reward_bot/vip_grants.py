@@ -0,0 +1,254 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+import discord
+from discord.ext import commands, tasks
+from tortoise.transactions import in_transaction
+
+from seeding_reward_bot import db
+from seeding_reward_bot.config import global_config
+from seeding_reward_bot.db import (
+    DeliveryState,
+    LedgerKind,
+    Seeding_Ledger,
+    VIP_Delivery,
+    VIP_Grant,
+)
+from seeding_reward_bot.hll_rcon_client import HLL_RCON_Error
+from seeding_reward_bot.main import HLLDiscordBot
+
+# Seconds - how often VIP deliveries due for a retry are attempted
+VIP_DELIVERY_TIMER = 30
+
+# Attempts of a VIP delivery before it is given up on
+VIP_DELIVERY_ATTEMPTS = 8
+
+# Seconds - delay before the first retry of a VIP delivery, doubling per attempt
+VIP_DELIVERY_BACKOFF = 30
+
+# Seconds - longest delay between retries of a VIP delivery
+VIP_DELIVERY_MAX_BACKOFF = 30 * 60
+
+# Interactions can be followed up for 15 minutes, later outcomes are sent by DM
+INTERACTION_LIFETIME = timedelta(minutes=14)
+
+
+class VIPGrants(commands.Cog):
+    """
+    Cog delivering claimed VIP from the `VIP_Delivery` outbox to each RCON
+    server, retrying failed servers with a backoff and confirming the result
+    against the server's VIP list, and telling the claiming user the outcome.
+
+    Deliveries aren't locked, so only a single bot process may run it.
+    """
+
+    def __init__(self, bot: HLLDiscordBot):
+        self.bot = bot
+        self.client = bot.client
+        self.logger = logging.getLogger(__name__)
+
+        # Server URL by server number of `RCON_URL`
+        self.servers = {
+            server: rcon_server_url
+            for rcon_server_url, server in global_config.rcon_url.items()
+        }
+        # Interaction of recent claims by grant id, to follow up on
+        self.interactions: dict[int, discord.ApplicationContext] = {}
+        self.lock = asyncio.Lock()
+        self.pending_tasks = set()
+
+        self.deliver.start()
+
+    def submit(self, grant: VIP_Grant, ctx: discord.ApplicationContext) -> None:
+        """
+        Deliver a new `grant` right away, following up on its claim's `ctx` with
+        the outcome.
+        """
+        self.interactions[grant.id] = ctx
+        task = asyncio.create_task(self.deliver_due())
+        self.pending_tasks.add(task)
+        task.add_done_callback(self.pending_tasks.discard)
+
+    @tasks.loop(seconds=VIP_DELIVERY_TIMER)
+    async def deliver(self):
+        await self.deliver_due()
+
+    @deliver.before_loop
+    async def before_deliver(self):
+        await db.initialized.wait()
+
+    async def deliver_due(self):
+        """
+        Attempt every delivery that is due, servers concurrently and each
+        server's deliveries in claim order, then notify the users of the grants
+        that are no longer pending.
+        """
+        async with self.lock:
+            try:
+                deliveries = await (
+                    VIP_Delivery.filter(
+                        state=DeliveryState.PENDING,
+                        next_attempt__lte=datetime.now(timezone.utc),
+                    )
+                    .select_related("grant__hll_player")
+                    .order_by("grant_id")
+                )
+                by_server = {}
+                for delivery in deliveries:
+                    by_server.setdefault(delivery.server, []).append(delivery)
+                await asyncio.gather(
+                    *(
+                        self.deliver_server(server_deliveries)
+                        for server_deliveries in by_server.values()
+                    )
+                )
+                await self.notify_outcomes()
+            except Exception:
+                self.logger.exception("Failed delivering VIP grants")
+
+    async def deliver_server(self, deliveries: list[VIP_Delivery]) -> None:
+        for delivery in deliveries:
+            await self.attempt(delivery)
+
+    async def attempt(self, delivery: VIP_Delivery) -> None:
+        grant = delivery.grant
+        player_id = grant.hll_player.player_id
+
+        # A later claim's expiration includes this one, granting this one after
+        # it landed would shorten the VIP. Only a delivered one counts, as one
+        # still pending may yet fail, and delivered ones never change state.
+        if await VIP_Delivery.filter(
+            server=delivery.server,
+            grant__hll_player_id=grant.hll_player_id,
+            grant_id__gt=grant.id,
+            state=DeliveryState.DONE,
+        ).exists():
+            delivery.state = DeliveryState.DONE
+            delivery.error = "Superseded by a later claim"
+            await delivery.save(update_fields=["state", "error"])
+            return
+
+        rcon_server_url = self.servers.get(delivery.server)
+        try:
+            if rcon_server_url is None:
+                raise HLL_RCON_Error(f"Server {delivery.server} isn't configured")
+            await self.client.grant_vip(
+                rcon_server_url, grant.player_name, player_id, grant.expiration
+            )
+            # Confirm the grant landed, the expiration is set to the second
+            vip = await self.client.get_server_vip(rcon_server_url, player_id)
+            if vip is None or datetime.fromisoformat(
+                vip
+            ) < grant.expiration - timedelta(seconds=1):
+                raise HLL_RCON_Error(
+                    f"VIP expiration is {vip} instead of {grant.expiration}"
+                )
+        except Exception as e:
+            delivery.attempts += 1
+            delivery.error = repr(e)
+            if rcon_server_url is None or delivery.attempts >= VIP_DELIVERY_ATTEMPTS:
+                delivery.state = DeliveryState.FAILED
+                self.logger.error(
+                    f"Gave up granting VIP of claim {grant.id} to {player_id} on server {delivery.server} after {delivery.attempts} attempts: {e!r}"
+                )
+            else:
+                backoff = min(
+                    VIP_DELIVERY_BACKOFF * 2 ** (delivery.attempts - 1),
+                    VIP_DELIVERY_MAX_BACKOFF,
+                )
+                delivery.next_attempt = datetime.now(timezone.utc) + timedelta(
+                    seconds=backoff
+                )
+                self.logger.warning(
+                    f"Failed granting VIP of claim {grant.id} to {player_id} on server {delivery.server} (attempt {delivery.attempts}), retrying in {backoff}s: {e!r}"
+                )
+        else:
+            delivery.state = DeliveryState.DONE
+            delivery.error = None
+        await delivery.save(
+            update_fields=["state", "attempts", "next_attempt", "error"]
+        )
+
+    async def notify_outcomes(self) -> None:
+        """
+        Tell the users of grants no longer pending on any server the outcome,
+        refunding the seeding hours of grants that failed on every server.
+        """
+        grants = await VIP_Grant.filter(notified=False).prefetch_related("deliveries")
+        for grant in grants:
+            states = {delivery.server: delivery.state for delivery in grant.deliveries}
+            if DeliveryState.PENDING in states.values():
+                continue
+
+            failed = sorted(
+                server
+                for server, state in states.items()
+                if state == DeliveryState.FAILED
+            )
+            community = global_config.server_communities.get(
+                grant.deliveries[0].server, global_config.default_community
+            )
+            vip_hours = community.seeder_vip_reward_hours * grant.hours
+            if not failed:
+                message = (
+                    f"<@{grant.discord_id}>: ✅ Your `{vip_hours}` hour(s) of VIP are active on every server.",
+                    f"Your VIP expires <t:{int(grant.expiration.timestamp())}:R>",
+                )
+            elif len(failed) == len(states):
+                message = (
+                    f"<@{grant.discord_id}>: ❌ Sorry, your `{vip_hours}` hour(s) of VIP couldn't be granted on any server.",
+                    f"Your `{grant.hours}` seeding hour(s) have been refunded, please try again later.",
+                )
+            else:
+                message = (
+                    f"<@{grant.discord_id}>: ⚠️ Your `{vip_hours}` hour(s) of VIP couldn't be granted on server(s) {', '.join(map(str, failed))}.",
+                    "Please open a ticket so an admin can add it.",
+                )
+
+            async with in_transaction():
+                if len(failed) == len(states):
+                    await Seeding_Ledger.create(
+                        hll_player_id=grant.hll_player_id,
+                        kind=LedgerKind.CLAIM,
+                        amount=timedelta(hours=grant.hours),
+                    )
+                grant.notified = True
+                await grant.save(update_fields=["notified"])
+            await self.notify(grant, "\n".join(message))
+
+    async def notify(self, grant: VIP_Grant, message: str) -> None:
+        ctx = self.interactions.pop(grant.id, None)
+        if (
+            ctx is not None
+            and datetime.now(timezone.utc) - grant.created < INTERACTION_LIFETIME
+        ):
+            try:
+                await ctx.followup.send(message, ephemeral=True)
+                return
+            except discord.HTTPException:
+                self.logger.warning(
+                    f"Failed following up on claim {grant.id}, sending a DM instead"
+                )
+
+        try:
+            user = await self.bot.get_or_fetch_user(grant.discord_id)
+            if user is not None:
+                await user.send(message)
+                return
+        except discord.HTTPException:
+            pass
+        self.logger.warning(
+            f"Failed to DM {grant.discord_id} the outcome of claim {grant.id}"
+        )
+
+    def cog_unload(self):
+        self.deliver.cancel()
+
+
+def setup(bot: HLLDiscordBot):
+    bot.add_cog(VIPGrants(bot))
+
+
+def teardown(bot: HLLDiscordBot):
+    pass